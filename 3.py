@@ -1,9 +1,12 @@
 import ffmpeg
 import os
 import pytesseract
-from PIL import Image
-import shutil
+import math
+import time
 import re # For regular expressions to extract numbers
+from slide_pipeline import (batch_scheduler, digit_templates, frame_stream, instrumentation, manifest, ocr_backends,
+                            ocr_cache, ocr_gate, parallel_ocr, preprocess, roi, roi_calibration, segments,
+                            slide_selector, slide_writer, transition_search)
 
 # --- Configuration ---
 VIDEO_FOLDER = r'C:\\ShaileshRajput\\Code\\img-process\\videos'   # IMPORTANT: Change this to your video folder path
@@ -21,6 +24,131 @@ pytesseract.pytesseract.tesseract_cmd = PYTESSERACT_PATH
 # For example, 1 second. If slides change very rapidly, even lower.
 FRAME_INTERVAL_SECONDS = 5
 
+# Where sampled frames come from:
+#   "roi"    - FFmpeg crops the page-number region and converts it to grayscale itself, so only
+#              that small strip crosses the pipe; full frames are fetched by timestamp for the
+#              slides that get selected.
+#   "stream" - FFmpeg pipes full raw frames straight into memory; only unique slides are written to disk.
+#   "disk"   - FFmpeg writes every sampled frame as a PNG under TEMP_FRAMES_FOLDER first (old behaviour).
+FRAME_SOURCE = "roi"
+
+# Skip Tesseract when the page-number region has not changed since the last OCR'd frame.
+# A frame counts as changed once more than OCR_GATE_THRESHOLD pixels (a count, not a share of the
+# region: the next page number can differ in only a few dozen pixels) moved by more than
+# OCR_GATE_PIXEL_DELTA gray levels; 0 OCRs on any such pixel. Set to None to OCR every frame.
+OCR_GATE_THRESHOLD = 0
+OCR_GATE_PIXEL_DELTA = 32
+
+# How samples are chosen:
+#   "interval"   - read the page number of every sample, one every FRAME_INTERVAL_SECONDS.
+#   "transition" - read a coarse grid of samples, one every TRANSITION_COARSE_SECONDS, using fast
+#                  FFmpeg input seeks, then bisect only the gaps where the page number changes until
+#                  each change is located to FRAME_INTERVAL_SECONDS. Relies on page numbers only going up.
+#   "keyframe"   - decode only the video's keyframes; in screen recordings a slide change usually starts
+#                  a new one. Where keyframes are more than KEYFRAME_MAX_GAP_SECONDS apart (long GOPs)
+#                  the gap is sampled every FRAME_INTERVAL_SECONDS instead, and so is the end of the video
+#                  after the last keyframe. A page shown for less than one shorter gap can be missed.
+#   "scene"      - take the frames whose FFmpeg scene score (0.0-1.0) is above SCENE_THRESHOLD, plus
+#                  one at least every SCENE_MAX_GAP_SECONDS for changes too small to score. Every frame
+#                  is still decoded, but only the chosen ones are converted and OCR'd.
+# "keyframe" and "scene" samples carry their presentation timestamps; they are always streamed, so
+# FRAME_SOURCE "disk" behaves like "stream" with them.
+SAMPLING_MODE = "interval"
+TRANSITION_COARSE_SECONDS = 30
+KEYFRAME_MAX_GAP_SECONDS = 10
+SCENE_THRESHOLD = 0.1
+SCENE_MAX_GAP_SECONDS = 30
+
+# Page-number OCR runs on a pool of OCR_WORKERS workers ("thread" or "process" pool); results are
+# put back in frame order, so the selected slides are exactly those of a serial run. At most
+# OCR_MAX_PENDING_FRAMES frames wait for OCR at once (None means twice the worker count).
+# Set OCR_WORKERS = 1 for the old serial loop.
+OCR_WORKERS = os.cpu_count() or 1
+OCR_EXECUTOR = "thread"
+OCR_MAX_PENDING_FRAMES = None
+
+# How page-number crops are handed to Tesseract (see slide_pipeline/ocr_backends.py):
+#   "pytesseract" - a new tesseract process per crop (original behaviour).
+#   "tesserocr"   - a long-lived Tesseract engine per worker; needs `pip install tesserocr`.
+#   "tiled"       - crops OCR'd at the same time are stacked into one image and read with one
+#                   tesseract call (up to OCR_WORKERS crops per call).
+OCR_BACKEND = "pytesseract"
+
+# Page-number crops can be cleaned up before OCR (see slide_pipeline/preprocess.py), OCR_PREPROCESS_BATCH
+# crops at a time as NumPy array operations: grayscale, contrast times PREPROCESS_CONTRAST (as
+# ImageEnhance.Contrast does it; None skips it), a threshold at PREPROCESS_THRESHOLD (a gray level, "otsu"
+# to pick one per crop, or None) and upscaling by PREPROCESS_SCALE (LANCZOS, or NEAREST once thresholded,
+# like PIL). The pixels are the same as the equivalent PIL calls give. Set OCR_PREPROCESS = False to OCR
+# the crops as they are.
+OCR_PREPROCESS = False
+PREPROCESS_CONTRAST = 2.0
+PREPROCESS_THRESHOLD = 180
+PREPROCESS_SCALE = 2
+OCR_PREPROCESS_BATCH = 16
+
+# Page numbers are read from digit templates where possible (see slide_pipeline/digit_templates.py):
+# the digits of the first crops Tesseract reads become templates, and later crops whose glyphs all
+# match one are read without Tesseract. Every DIGIT_TEMPLATE_VERIFY_EVERY-th template read is checked
+# with Tesseract as well (None never checks); the agreement is printed per video. Not used with
+# OCR_EXECUTOR = "process". Set DIGIT_TEMPLATES = False to send every crop to Tesseract.
+DIGIT_TEMPLATES = True
+DIGIT_TEMPLATE_VERIFY_EVERY = 20
+
+# OCR results are cached on disk in SQLite, keyed by a hash of the crop's pixels plus the Tesseract
+# config and OCR_BACKEND, so re-runs (e.g. after changing FRAME_INTERVAL_SECONDS, or running 3.py
+# after 4.py) skip crops already seen. The least recently used entries are dropped beyond
+# OCR_CACHE_MAX_ENTRIES.
+# Set OCR_CACHE_PATH to None to disable the cache.
+OCR_CACHE_PATH = "ocr_cache.sqlite3"
+OCR_CACHE_MAX_ENTRIES = 200000
+
+# Number of videos processed at the same time, so one video's FFmpeg decode overlaps another's OCR.
+# Videos are started longest first. When more than one runs at once, the cores are split between
+# them, BATCH_FFMPEG_SHARE of each video's share going to FFmpeg threads and the rest to OCR workers
+# (overriding OCR_WORKERS and FFMPEG_THREADS).
+BATCH_CONCURRENT_VIDEOS = 2
+BATCH_FFMPEG_SHARE = 0.25
+
+# A long video can be split into SEGMENT_WORKERS time segments of at least SEGMENT_MIN_SECONDS each,
+# each decoded (FFmpeg seeks straight to its start) and OCR'd in its own worker process, with the video's
+# cores split between them. The page runs of the segments are merged, so the slides are the same as a
+# serial run with FRAME_SOURCE "roi" picks (see slide_pipeline/segments.py). Only used with
+# SAMPLING_MODE "interval" and FRAME_SOURCE "roi" or "stream"; segments always stream the page-number
+# region. Each segment starts with a fresh OCR gate, so at a segment's start it OCRs a region the gate
+# of a serial run might have skipped. Set SEGMENT_WORKERS = 1 to read every video in one pass.
+SEGMENT_WORKERS = 1
+SEGMENT_MIN_SECONDS = 600
+
+# How the unique slides are written (see slide_pipeline/slide_writer.py): encoded straight from the
+# decoded frame as SLIDE_FORMAT "png" (lossless), "jpeg" or "webp" at SLIDE_QUALITY (1-100, not used for
+# "png"), by SLIDE_WRITE_WORKERS background threads while later frames are OCR'd (0 writes each slide
+# before moving on). SLIDE_ARCHIVE packs a video's slides into one "zip" or multi-page "pdf" file once it
+# is done (None keeps the image files), and SLIDE_INDEX writes <video>_slides.json with the page number,
+# timestamp and sample index of every slide.
+SLIDE_FORMAT = "png"
+SLIDE_QUALITY = 90
+SLIDE_WRITE_WORKERS = 2
+SLIDE_ARCHIVE = None
+SLIDE_INDEX = True
+FFMPEG_THREADS = None # FFmpeg decoder threads per video; None lets FFmpeg decide
+
+# A JSON manifest per video in MANIFEST_FOLDER records the video's size and mtime, a hash of the
+# settings that decide which slides are picked, the slides saved so far and the last sample read.
+# Videos finished by an earlier run with the same settings are skipped; interrupted ones carry on
+# from their last checkpoint (saved every MANIFEST_CHECKPOINT_SECONDS) when FRAME_SOURCE streams,
+# SAMPLING_MODE is "interval" and SEGMENT_WORKERS is 1, and start over otherwise. Set MANIFEST_FOLDER to None to
+# reprocess every video on every run.
+MANIFEST_FOLDER = "manifests"
+MANIFEST_CHECKPOINT_SECONDS = 60
+
+# Time spent per stage (probe, extract, decode, crop, ocr, fetch_frame, write_slide) and counters
+# (frames decoded, OCR calls and failures, bytes written, ...) for every video are written to
+# INSTRUMENTATION_FOLDER as a JSON and a CSV report per run, with a summary table at the end.
+# With PROFILE_VIDEOS a cProfile dump (<video name>.prof) per video is saved there as well.
+# Set INSTRUMENTATION_FOLDER to None to turn all of it off.
+INSTRUMENTATION_FOLDER = None
+PROFILE_VIDEOS = False
+
 # --- Page Number Region Configuration ---
 # These values are crucial and might need adjustment based on your videos.
 # Define the coordinates (left, upper, right, lower) for the cropping box.
@@ -36,6 +164,18 @@ PAGE_NUMBER_REGION_HEIGHT = 80 # Estimated height of the region
 PAGE_NUMBER_REGION_OFFSET_X = -5 # How far from the right edge
 PAGE_NUMBER_REGION_OFFSET_Y = 20 # How far from the bottom edge
 
+# Instead of trusting the region above, calibrate it once per video resolution: ROI_CALIBRATION_SAMPLES
+# frames spread over the video are compared inside the bottom-right ROI_CALIBRATION_SEARCH_FRACTION
+# (of the width, of the height) of the frame, and the tight box around the pixels that change between
+# them (padded by about a digit) is used whenever OCR reads page numbers from it on at least as many
+# samples as from the region above. Results are cached by resolution in ROI_CALIBRATION_CACHE_PATH
+# (None keeps them for one run only). A video where neither box reads a number on any sample is skipped
+# instead of OCR'ing every frame for nothing. Set ROI_CALIBRATION = False to always use the region above.
+ROI_CALIBRATION = True
+ROI_CALIBRATION_SAMPLES = 8
+ROI_CALIBRATION_SEARCH_FRACTION = (0.3, 0.25)
+ROI_CALIBRATION_CACHE_PATH = "roi_calibration.json"
+
 
 # --- Functions ---
 
@@ -44,6 +184,8 @@ def create_output_directories():
     os.makedirs(OUTPUT_UNIQUE_SLIDES_FOLDER, exist_ok=True)
     os.makedirs(OUTPUT_TEXT_FOLDER, exist_ok=True)
     os.makedirs(TEMP_FRAMES_FOLDER, exist_ok=True)
+    if INSTRUMENTATION_FOLDER:
+        os.makedirs(INSTRUMENTATION_FOLDER, exist_ok=True)
 
 def clean_temp_frames():
     """Removes the temporary frames folder."""
@@ -57,11 +199,13 @@ def extract_frames(video_path, output_dir, interval_seconds):
     """
     print(f"Extracting frames from {video_path}...")
     try:
-        # ffmpeg -i input.mp4 -vf fps=1/X output_frames_%04d.png
+        # ffmpeg -i input.mp4 -vf fps=1/X:round=up output_frames_%04d.png
         (
             ffmpeg
             .input(video_path)
-            .output(os.path.join(output_dir, 'frame_%04d.png'), vf=f'fps=1/{interval_seconds}')
+            # round=up: frame_k is the first frame at or after k * interval_seconds, the timestamp
+            # frame_stream.frames_from_folder gives it and the frame the streaming sources take
+            .output(os.path.join(output_dir, 'frame_%04d.png'), vf=f'fps=1/{interval_seconds}:round=up')
             .run(capture_stdout=True, capture_stderr=True)
         )
         print(f"Frames extracted to {output_dir}")
@@ -71,34 +215,74 @@ def extract_frames(video_path, output_dir, interval_seconds):
         return False
     return True
 
-def get_page_number_from_image(image_path):
+def configured_crop_box(img_width, img_height):
+    """Returns the (left, upper, right, lower) box of the PAGE_NUMBER_REGION_* settings for a frame of the given size."""
+    return roi.page_number_crop_box(img_width, img_height,
+                                    PAGE_NUMBER_REGION_WIDTH, PAGE_NUMBER_REGION_HEIGHT,
+                                    PAGE_NUMBER_REGION_OFFSET_X, PAGE_NUMBER_REGION_OFFSET_Y)
+
+def get_page_number_crop_box(img_width, img_height):
     """
-    Extracts the page number from the bottom-right corner of an image.
-    Returns None if no number is found or on error.
+    Returns the (left, upper, right, lower) page-number box for a frame of the given size:
+    the one ROI_CALIBRATION found for that resolution, or else the configured region.
+    """
+    if ROI_CALIBRATION:
+        crop_box = roi_calibration.get_cache(ROI_CALIBRATION_CACHE_PATH).box(img_width, img_height)
+        if crop_box is not None:
+            return crop_box
+    return configured_crop_box(img_width, img_height)
+
+def crop_page_number_region(image, frame_label=None):
+    """
+    Crops the page-number region out of a full frame (a file path, a PIL image
+    or a NumPy frame from frame_stream) and returns it as a PIL image.
+    `frame_label` names the frame in error messages (defaults to the path).
+    Returns None on error.
     """
     try:
-        img = Image.open(image_path)
-        img_width, img_height = img.size
-
-        # Calculate crop box coordinates
-        left = img_width - PAGE_NUMBER_REGION_WIDTH - PAGE_NUMBER_REGION_OFFSET_X
-        upper = img_height - PAGE_NUMBER_REGION_HEIGHT - PAGE_NUMBER_REGION_OFFSET_Y
-        right = img_width - PAGE_NUMBER_REGION_OFFSET_X
-        lower = img_height - PAGE_NUMBER_REGION_OFFSET_Y
-
-        # Ensure coordinates are within image bounds
-        left = max(0, left)
-        upper = max(0, upper)
-        right = min(img_width, right)
-        lower = min(img_height, lower)
-
-        crop_box = (left, upper, right, lower)
-        cropped_img = img.crop(crop_box)
+        img = frame_stream.to_pil_image(image)
+        cropped_img = img.crop(get_page_number_crop_box(*img.size))
         
         # You can uncomment to save cropped images for debugging:
-        #cropped_img.save(f"debug_cropped_{os.path.basename(image_path)}")
+        #cropped_img.save(f"debug_cropped_{os.path.basename(frame_label)}")
+    except Exception as e:
+        print(f"Error processing image {frame_label or image} for page number: {e}")
+        return None
+    return cropped_img
+
+def get_page_number_from_image(image, frame_label=None):
+    """
+    Extracts the page number from the bottom-right corner of an image.
+    Returns None if no number is found or on error.
+    """
+    cropped_img = crop_page_number_region(image, frame_label)
+    if cropped_img is None:
+        return None
+    return get_page_number_from_roi(cropped_img, frame_label or image)
+
+def get_ocr_backend():
+    """Returns the OCR backend selected by OCR_BACKEND, behind the OCR cache if enabled."""
+    ocr_backend = ocr_backends.get_backend(OCR_BACKEND, OCR_WORKERS)
+    if OCR_CACHE_PATH:
+        ocr_backend = ocr_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_ENTRIES).wrap(ocr_backend)
+    return ocr_backend
+
+def get_preprocessor():
+    """Returns the preprocess.Preprocessor set up by OCR_PREPROCESS and PREPROCESS_*, or None if it is off."""
+    if not OCR_PREPROCESS:
+        return None
+    return preprocess.Preprocessor(PREPROCESS_CONTRAST, PREPROCESS_THRESHOLD, PREPROCESS_SCALE)
 
-        text = pytesseract.image_to_string(cropped_img, config='--psm 6') # psm 8 for single word/number
+def get_page_number_from_roi(cropped_img, frame_label=None):
+    """
+    Extracts the page number from an already-cropped page-number region
+    (a PIL image or the NumPy arrays yielded by frame_stream.stream_rois).
+    Returns None if no number is found or on error.
+    """
+    try:
+        cropped_img = frame_stream.to_pil_image(cropped_img)
+        ocr_backend = get_ocr_backend()
+        text = ocr_backend.image_to_string(cropped_img, config='--psm 6') # psm 8 for single word/number
         print(text)
         # Use regex to find digits. Tesseract might pick up noise.
         numbers = re.findall(r'\d+', text)
@@ -110,81 +294,481 @@ def get_page_number_from_image(image_path):
         print(f"Please ensure Tesseract is installed and {PYTESSERACT_PATH} is correct.")
         return None
     except Exception as e:
-        print(f"Error processing image {image_path} for page number: {e}")
+        print(f"Error processing image {frame_label} for page number: {e}")
         return None
 
-def process_video_for_unique_slides(video_file):
+def save_unique_slide(frame, video_full_path, destination_path, frames_are_rois,
+                      recorder=instrumentation.NULL_RECORDER):
+    """
+    Writes a selected frame to `destination_path` as SLIDE_FORMAT (called on a
+    slide_writer.SlideWriter's threads). When frames only hold the page-number strip
+    (or nothing, after a transition search) the full-resolution frame is fetched by
+    timestamp.
+    """
+    if frames_are_rois:
+        with recorder.stage("fetch_frame"):
+            frame = frame._replace(image=frame_stream.fetch_frame(video_full_path, frame.timestamp,
+                                                                  threads=FFMPEG_THREADS))
+    with recorder.stage("write_slide"):
+        frame_stream.save_frame(frame, destination_path, **slide_writer.save_options(SLIDE_FORMAT, SLIDE_QUALITY))
+    if recorder.enabled:
+        recorder.count("bytes_written", os.path.getsize(destination_path))
+
+def pack_slides(video_name, video_file, slides, recorder=instrumentation.NULL_RECORDER):
+    """
+    Packs the written `slides` of a video as SLIDE_ARCHIVE and writes their SLIDE_INDEX.
+    Packed slides get the archive as their `file`, so a stale manifest deletes it.
+    """
+    with recorder.stage("pack_slides"):
+        files = [slide.file for slide in slides]
+        archive_path = slide_writer.pack(OUTPUT_UNIQUE_SLIDES_FOLDER, video_name, files, SLIDE_ARCHIVE)
+        if SLIDE_INDEX:
+            pages = [slide.as_dict() for slide in slides]
+            index_path = slide_writer.write_index(OUTPUT_UNIQUE_SLIDES_FOLDER, video_name, video_file, pages,
+                                                  archive_path)
+            print(f"Slide index written to {index_path}")
+    if archive_path is not None:
+        for slide in slides:
+            slide.file = archive_path
+        print(f"Packed {len(files)} slides into {archive_path}")
+
+def calibrate_page_number_region(video_full_path, recorder=instrumentation.NULL_RECORDER):
+    """
+    Calibrates the page-number region for the video's resolution unless that is cached
+    (see ROI_CALIBRATION). Returns False if no calibration sample had a readable page
+    number, in the calibrated region or the configured one.
+    """
+    with recorder.stage("probe"):
+        img_width, img_height, duration = frame_stream.probe_video(video_full_path)
+    default_box = configured_crop_box(img_width, img_height)
+    search = roi_calibration.search_box(img_width, img_height, *ROI_CALIBRATION_SEARCH_FRACTION, default_box)
+    cache = roi_calibration.get_cache(ROI_CALIBRATION_CACHE_PATH)
+    if cache.lookup(img_width, img_height, search, default_box) is not None:
+        return True
+
+    print(f"Calibrating the page-number region for {img_width}x{img_height} on {video_full_path}...")
+    with recorder.stage("calibrate"):
+        read_page_number = get_page_number_from_roi
+        preprocessor = get_preprocessor()
+        if preprocessor is not None:
+            read_page_number = preprocessor.wrap(read_page_number)
+        calibration = roi_calibration.calibrate(video_full_path, duration, search, default_box, read_page_number,
+                                                ROI_CALIBRATION_SAMPLES, FFMPEG_THREADS)
+    if calibration.readable == 0:
+        return False
+    if calibration.box != default_box:
+        print(f"Page-number region {calibration.box} read {calibration.readable} of {calibration.samples} samples "
+              f"(configured region {default_box}: {calibration.default_readable}).")
+    else:
+        print(f"Keeping the configured page-number region {default_box} "
+              f"({calibration.readable} of {calibration.samples} samples read).")
+    if calibration.candidates:
+        # With no changing region (e.g. every sample on the same page) nothing was compared, so
+        # leave the resolution for a later video to calibrate
+        cache.store(img_width, img_height, search, default_box, calibration)
+    return True
+
+def open_frame_source(video_full_path, temp_video_frames_dir, start_index=0, recorder=instrumentation.NULL_RECORDER):
+    """
+    Starts sampling a video according to FRAME_SOURCE and SAMPLING_MODE ("interval",
+    "keyframe" or "scene"), from sample `start_index` ("interval" streaming only;
+    "disk" always extracts the whole video).
+    Returns (frames, frames_are_rois): an iterator of frame_stream.Frame and
+    whether their images are already cropped to the page-number region.
+    Returns None if FFmpeg fails before any frame is produced.
+    """
+    if FRAME_SOURCE == "disk" and SAMPLING_MODE == "interval":
+        os.makedirs(temp_video_frames_dir, exist_ok=True)
+        with recorder.stage("extract"):
+            extracted = extract_frames(video_full_path, temp_video_frames_dir, FRAME_INTERVAL_SECONDS)
+        if not extracted:
+            return None
+        if recorder.enabled:
+            recorder.count("temp_bytes_written", sum(entry.stat().st_size for entry in os.scandir(temp_video_frames_dir)))
+        return frame_stream.frames_from_folder(temp_video_frames_dir, FRAME_INTERVAL_SECONDS), False
+
+    crop_box = None
+    if FRAME_SOURCE == "roi":
+        try:
+            with recorder.stage("probe"):
+                img_width, img_height, _ = frame_stream.probe_video(video_full_path)
+        except ffmpeg.Error as e:
+            print(f"FFmpeg error for {video_full_path}:")
+            print(e.stderr.decode('utf8'))
+            return None
+        crop_box = get_page_number_crop_box(img_width, img_height)
+
+    if SAMPLING_MODE == "keyframe":
+        print(f"Streaming keyframes from {video_full_path}...")
+        frames = frame_stream.stream_keyframes(video_full_path, crop_box, KEYFRAME_MAX_GAP_SECONDS,
+                                               FRAME_INTERVAL_SECONDS, FFMPEG_THREADS)
+    elif SAMPLING_MODE == "scene":
+        print(f"Streaming scene changes from {video_full_path}...")
+        frames = frame_stream.stream_scene_changes(video_full_path, SCENE_THRESHOLD, SCENE_MAX_GAP_SECONDS,
+                                                   crop_box, FFMPEG_THREADS)
+    elif crop_box is not None:
+        print(f"Streaming page-number region {crop_box} from {video_full_path}...")
+        frames = frame_stream.stream_rois(video_full_path, FRAME_INTERVAL_SECONDS, crop_box, FFMPEG_THREADS,
+                                          start_index)
+    else:
+        print(f"Streaming frames from {video_full_path}...")
+        frames = frame_stream.stream_frames(video_full_path, FRAME_INTERVAL_SECONDS, FFMPEG_THREADS, start_index)
+    return frames, crop_box is not None
+
+def iter_page_numbers(frames, frames_are_rois, gate, recorder=instrumentation.NULL_RECORDER, recognizer=None):
+    """
+    Yields (frame, page_number) for every sampled frame, in order. The OCR runs on
+    OCR_WORKERS workers; `gate` (an ocr_gate.OcrGate, or None) skips regions that
+    have not changed since the last one sent to OCR. With OCR_PREPROCESS the regions
+    are preprocessed in batches first, so the gate compares the cleaned-up crops.
+    `recognizer` (a digit_templates.DigitRecognizer, or None) reads what it can before Tesseract.
+    """
+    def regions():
+        # "decode" is the wait for FFmpeg's pipe, or the PNG reads of FRAME_SOURCE "disk"
+        for frame in recorder.iterate("decode", frames, "frames_decoded"):
+            frame_file = frame_stream.frame_filename(frame.index)
+            if frames_are_rois:
+                cropped_img = frame.image
+            else:
+                with recorder.stage("crop"):
+                    cropped_img = crop_page_number_region(frame.image, frame_file)
+            yield frame, (None if cropped_img is None else (cropped_img, frame_file))
+
+    skip = None
+    if gate is not None:
+        skip = lambda frame, args: gate.should_skip(args[0])
+    read_page_number = get_page_number_from_roi
+    if OCR_EXECUTOR != "process": # A process pool has to pickle the function, so OCR goes untimed there
+        read_page_number = recorder.timed("ocr", get_page_number_from_roi, none_counter="ocr_failures")
+    if recognizer is not None:
+        read_page_number = recognizer.wrap(read_page_number) # "ocr" then only times the Tesseract reads
+    items = regions()
+    preprocessor = get_preprocessor()
+    if preprocessor is not None:
+        items = preprocess.map_batches(items, OCR_PREPROCESS_BATCH, recorder.timed("preprocess", preprocessor))
+    if OCR_EXECUTOR == "process" and OCR_WORKERS > 1 and OCR_CACHE_PATH:
+        # Each worker process counts its own OCR cache hits; they come back with its results
+        results = parallel_ocr.ordered_map(read_page_number_in_worker, items, OCR_WORKERS,
+                                           OCR_EXECUTOR, OCR_MAX_PENDING_FRAMES, skip)
+        return ocr_cache.add_worker_counts(results, ocr_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_ENTRIES))
+    return parallel_ocr.ordered_map(read_page_number, items, OCR_WORKERS,
+                                    OCR_EXECUTOR, OCR_MAX_PENDING_FRAMES, skip)
+
+def read_page_number_in_worker(cropped_img, frame_label=None):
+    """
+    get_page_number_from_roi for an OCR_EXECUTOR "process" worker with the OCR cache on.
+    Returns (page_number, (hits, misses)), the worker's cache counts since its last call.
+    """
+    return (get_page_number_from_roi(cropped_img, frame_label),
+            ocr_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_ENTRIES).take_counts())
+
+def search_page_transitions(video_full_path, read_roi, recorder=instrumentation.NULL_RECORDER):
+    """
+    Yields (frame, page_number) for the first readable sample of each page, located with
+    transition_search instead of reading every sample. The frames carry no image;
+    save_unique_slide fetches the selected ones by timestamp.
+    """
+    with recorder.stage("probe"):
+        img_width, img_height, duration = frame_stream.probe_video(video_full_path)
+    crop_box = get_page_number_crop_box(img_width, img_height)
+    sample_count = math.ceil(duration / FRAME_INTERVAL_SECONDS)
+
+    def read_page_at(index):
+        with recorder.stage("decode"):
+            roi_image = frame_stream.fetch_roi(video_full_path, index * FRAME_INTERVAL_SECONDS, crop_box, FFMPEG_THREADS)
+        recorder.count("frames_decoded")
+        if roi_image is None:
+            return None
+        return read_roi(roi_image, frame_stream.frame_filename(index))
+
+    print(f"Searching for page transitions in {video_full_path}...")
+    coarse_step = max(1, round(TRANSITION_COARSE_SECONDS / FRAME_INTERVAL_SECONDS))
+    runs, probed = transition_search.find_page_runs(read_page_at, sample_count, coarse_step)
+    print(f"Transition search read {probed} of {sample_count} samples and found {len(runs)} pages.")
+    for page_number, first_index, _ in runs:
+        yield frame_stream.Frame(first_index, first_index * FRAME_INTERVAL_SECONDS, None, None), page_number
+
+def scan_segment(start_index, stop_index, video_full_path, crop_box, ffmpeg_threads, ocr_workers, instrumented):
+    """
+    Reads the page numbers of samples start_index .. stop_index - 1 (to the end of the video if
+    stop_index is None) in a SEGMENT_WORKERS process, with its share of the video's cores.
+    Returns the segment's page runs (see segments.page_runs) and its OCR and OCR cache counts
+    as a dict, with FFmpeg's stderr under "ffmpeg_error" if it failed (ffmpeg.Error does not
+    survive pickling).
+    """
+    global FFMPEG_THREADS, OCR_WORKERS
+    FFMPEG_THREADS, OCR_WORKERS = ffmpeg_threads, ocr_workers # Only this worker process's copy
+    recorder = instrumentation.create_recorder(instrumented)
+    gate = None
+    if OCR_GATE_THRESHOLD is not None:
+        gate = ocr_gate.OcrGate(OCR_GATE_THRESHOLD, OCR_GATE_PIXEL_DELTA)
+    recognizer = None
+    if DIGIT_TEMPLATES and OCR_EXECUTOR != "process":
+        recognizer = digit_templates.DigitRecognizer(DIGIT_TEMPLATE_VERIFY_EVERY)
+    frames = frame_stream.stream_rois(video_full_path, FRAME_INTERVAL_SECONDS, crop_box, FFMPEG_THREADS,
+                                      start_index, stop_index)
+    try:
+        runs, samples, unreadable = segments.page_runs(iter_page_numbers(frames, True, gate, recorder, recognizer))
+    except ffmpeg.Error as e:
+        return {"ffmpeg_error": e.stderr}
+    return {
+        "runs": runs,
+        "samples": samples,
+        "unreadable": unreadable,
+        "ocr_calls": (gate.ocr_calls, gate.ocr_calls_saved) if gate is not None else None,
+        "digit_templates": recognizer.stats() if recognizer is not None else None,
+        "ocr_cache": (ocr_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_ENTRIES).take_counts()
+                      if OCR_CACHE_PATH else None),
+        "instrumentation": recorder.as_dict(),
+    }
+
+def read_page_segments(video_full_path, start_index, gate, recognizer, recorder=instrumentation.NULL_RECORDER):
+    """
+    Reads the page numbers of a video from sample `start_index` on in up to SEGMENT_WORKERS
+    time segments at once. Returns ([(frame, page_number)], samples): the first readable sample
+    of each page, which is all the selector needs from a page, and how many samples the
+    segments read; or None if the video is too short to split. The frames carry no image;
+    save_unique_slide fetches the selected ones by timestamp. The segments' OCR counts are
+    added to `gate`, `recognizer` and `recorder`. Raises ffmpeg.Error if a segment's FFmpeg
+    failed.
+    """
+    with recorder.stage("probe"):
+        img_width, img_height, duration = frame_stream.probe_video(video_full_path)
+    sample_count = math.ceil(duration / FRAME_INTERVAL_SECONDS)
+    min_samples = max(1, round(SEGMENT_MIN_SECONDS / FRAME_INTERVAL_SECONDS))
+    ranges = segments.split_samples(start_index, sample_count, SEGMENT_WORKERS, min_samples)
+    if len(ranges) < 2:
+        return None
+    crop_box = get_page_number_crop_box(img_width, img_height)
+    ffmpeg_threads, ocr_workers = batch_scheduler.split_cores(len(ranges), BATCH_FFMPEG_SHARE,
+                                                             OCR_WORKERS + (FFMPEG_THREADS or 0))
+    print(f"Reading {video_full_path} in {len(ranges)} segments "
+          f"({ffmpeg_threads} FFmpeg threads and {ocr_workers} OCR workers each)...")
+    results = segments.run_segments(scan_segment, ranges, len(ranges), video_full_path, crop_box,
+                                    ffmpeg_threads, ocr_workers, recorder.enabled)
+    for result in results:
+        if "ffmpeg_error" in result:
+            raise ffmpeg.Error('ffmpeg', None, result["ffmpeg_error"])
+    for result in results:
+        recorder.merge(result["instrumentation"])
+        if gate is not None and result["ocr_calls"] is not None:
+            gate.ocr_calls += result["ocr_calls"][0]
+            gate.ocr_calls_saved += result["ocr_calls"][1]
+        if recognizer is not None and result["digit_templates"] is not None:
+            recognizer.add_counts(result["digit_templates"])
+        if result["ocr_cache"] is not None:
+            ocr_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_ENTRIES).add_counts(*result["ocr_cache"])
+    runs = segments.merge_runs(result["runs"] for result in results)
+    samples = sum(result["samples"] for result in results)
+    unreadable = sum(result["unreadable"] for result in results)
+    recorder.count("frames_without_page_number", unreadable)
+    print(f"The segments read {samples} samples ({unreadable} without a page number) and found {len(runs)} pages.")
+    pages = [(frame_stream.Frame(first_index, first_index * FRAME_INTERVAL_SECONDS, None, None), page_number)
+             for page_number, first_index, _ in runs]
+    return pages, samples
+
+def manifest_settings(crop_box):
+    """
+    Returns the settings that decide which slides are picked and how they are written;
+    a manifest made with others is stale. `crop_box` is the page-number box actually
+    read for the video, which ROI_CALIBRATION may have moved.
+    """
+    return {
+        "strategy": "first",
+        "frame_interval_seconds": FRAME_INTERVAL_SECONDS,
+        "page_number_region": [PAGE_NUMBER_REGION_WIDTH, PAGE_NUMBER_REGION_HEIGHT,
+                               PAGE_NUMBER_REGION_OFFSET_X, PAGE_NUMBER_REGION_OFFSET_Y],
+        "roi_calibration": [ROI_CALIBRATION_SAMPLES, list(ROI_CALIBRATION_SEARCH_FRACTION)] if ROI_CALIBRATION else None,
+        "page_number_box": list(crop_box),
+        "ocr_backend": OCR_BACKEND,
+        "ocr_gate": [OCR_GATE_THRESHOLD, OCR_GATE_PIXEL_DELTA] if OCR_GATE_THRESHOLD is not None else None,
+        "preprocess": [PREPROCESS_CONTRAST, PREPROCESS_THRESHOLD, PREPROCESS_SCALE] if OCR_PREPROCESS else None,
+        "slides": [SLIDE_FORMAT, SLIDE_QUALITY if SLIDE_FORMAT != "png" else None, SLIDE_ARCHIVE],
+        "digit_templates": DIGIT_TEMPLATE_VERIFY_EVERY if DIGIT_TEMPLATES and OCR_EXECUTOR != "process" else None,
+        "sampling_mode": SAMPLING_MODE,
+        "transition_coarse_seconds": TRANSITION_COARSE_SECONDS if SAMPLING_MODE == "transition" else None,
+        "keyframe_max_gap_seconds": KEYFRAME_MAX_GAP_SECONDS if SAMPLING_MODE == "keyframe" else None,
+        "scene": [SCENE_THRESHOLD, SCENE_MAX_GAP_SECONDS] if SAMPLING_MODE == "scene" else None,
+    }
+
+def find_unique_slides(video_file, recorder):
     """
     Processes a single video file to extract unique slides based on page number.
+    Stage times and counters go to `recorder` (an instrumentation.Recorder, or NULL_RECORDER).
+    Returns {"frames": ..., "slides": ...} counts, or None if the video was skipped.
     """
     video_name = os.path.splitext(os.path.basename(video_file))[0]
     video_full_path = os.path.join(VIDEO_FOLDER, video_file)
-    
-    temp_video_frames_dir = os.path.join(TEMP_FRAMES_FOLDER, video_name)
-    os.makedirs(temp_video_frames_dir, exist_ok=True)
 
-    if not extract_frames(video_full_path, temp_video_frames_dir, FRAME_INTERVAL_SECONDS):
-        print(f"Skipping {video_file} due to FFmpeg error during frame extraction.")
-        #shutil.rmtree(temp_video_frames_dir)
-        return
+    # Calibrated first, so the manifest can tell whether the page-number box moved since
+    # the last run
+    if ROI_CALIBRATION:
+        try:
+            readable = calibrate_page_number_region(video_full_path, recorder)
+        except ffmpeg.Error as e:
+            print(f"FFmpeg error for {video_full_path}:")
+            print(e.stderr.decode('utf8'))
+            print(f"Skipping {video_file} due to FFmpeg error during page-number calibration.")
+            return
+        if not readable:
+            print(f"Skipping {video_file}: no page number could be read on any calibration sample. "
+                  f"Check PAGE_NUMBER_REGION_* and ROI_CALIBRATION_SEARCH_FRACTION.")
+            return
 
-    frame_files = sorted([f for f in os.listdir(temp_video_frames_dir) if f.lower().endswith(('.png', '.jpg'))])
+    video_manifest = None
+    checkpointer = None
+    if MANIFEST_FOLDER:
+        try:
+            with recorder.stage("probe"):
+                img_width, img_height, _ = frame_stream.probe_video(video_full_path)
+        except ffmpeg.Error as e:
+            print(f"FFmpeg error for {video_full_path}:")
+            print(e.stderr.decode('utf8'))
+            print(f"Skipping {video_file} due to FFmpeg error while probing the video.")
+            return
+        manifest_file = manifest.manifest_path(MANIFEST_FOLDER, video_file, "first")
+        # Segments checkpoint nothing while they read, which is where the time goes, so a segmented
+        # video always starts over
+        can_resume = SAMPLING_MODE == "interval" and FRAME_SOURCE != "disk" and SEGMENT_WORKERS <= 1
+        settings = manifest_settings(get_page_number_crop_box(img_width, img_height))
+        action, video_manifest = manifest.open_manifest(manifest_file, video_full_path, settings, can_resume)
+        if action == "skip":
+            print(f"Skipping {video_file}: unchanged since it was last processed.")
+            return {"frames": video_manifest["frames"], "slides": len(video_manifest["pages"]), "status": "unchanged"}
+        if action == "resume":
+            print(f"Resuming {video_file} after {video_manifest['last_processed_timestamp']} s.")
+        checkpointer = manifest.Checkpointer(manifest_file, video_manifest, MANIFEST_CHECKPOINT_SECONDS)
+    start_index = video_manifest["next_index"] if video_manifest else 0
 
-    if not frame_files:
-        print(f"No frames extracted for {video_file}. Check video file or FRAME_INTERVAL_SECONDS.")
-        #shutil.rmtree(temp_video_frames_dir)
-        return
+    gate = None
+    if OCR_GATE_THRESHOLD is not None:
+        gate = ocr_gate.OcrGate(OCR_GATE_THRESHOLD, OCR_GATE_PIXEL_DELTA)
+    recognizer = None
+    if DIGIT_TEMPLATES and OCR_EXECUTOR != "process": # The templates live in this process
+        recognizer = digit_templates.DigitRecognizer(DIGIT_TEMPLATE_VERIFY_EVERY)
+    if OCR_WORKERS > 1:
+        # Tesseract's own OpenMP threads only fight with our workers for cores
+        os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+    temp_video_frames_dir = os.path.join(TEMP_FRAMES_FOLDER, video_name)
+    page_numbers = None
+    segment_samples = None # Samples the segments read; page_numbers then holds one per page
+    if SEGMENT_WORKERS > 1 and SAMPLING_MODE == "interval" and FRAME_SOURCE != "disk":
+        try:
+            segments_read = read_page_segments(video_full_path, start_index, gate, recognizer, recorder)
+        except ffmpeg.Error as e:
+            print(f"FFmpeg error for {video_full_path}:")
+            print(e.stderr.decode('utf8'))
+            print(f"Skipping {video_file} due to FFmpeg error during frame extraction.")
+            return
+        if segments_read is not None:
+            page_numbers, segment_samples = segments_read
+        frames_are_rois = True
+    if SAMPLING_MODE == "transition":
+        read_page_number = recorder.timed("ocr", get_page_number_from_roi, none_counter="ocr_failures")
+        preprocessor = get_preprocessor()
+        if preprocessor is not None:
+            read_page_number = preprocessor.wrap(read_page_number)
+        if recognizer is not None:
+            read_page_number = recognizer.wrap(read_page_number)
+        read_roi = gate.wrap(read_page_number) if gate is not None else read_page_number
+        page_numbers = search_page_transitions(video_full_path, read_roi, recorder)
+        frames_are_rois = True
+    elif page_numbers is None:
+        frame_source = open_frame_source(video_full_path, temp_video_frames_dir, start_index, recorder)
+        if frame_source is None:
+            print(f"Skipping {video_file} due to FFmpeg error during frame extraction.")
+            #shutil.rmtree(temp_video_frames_dir)
+            return
+        frames, frames_are_rois = frame_source
+        page_numbers = iter_page_numbers(frames, frames_are_rois, gate, recorder, recognizer)
 
     print(f"Comparing frames for unique slides from {video_file}...")
 
-    previous_page_number = -1 # Initialize with a value that ensures the first page is always picked
-    current_image_path = None
+    # The selector keeps the first frame of every page; see slide_selector.FirstOccurrenceSelector
+    selector = slide_selector.create_selector("first")
+    frame_count = 0
+    next_index = start_index
+    if start_index:
+        selector = slide_selector.create_selector("first", video_manifest["pages"], video_manifest["state"])
+        frame_count = video_manifest["frames"]
+    if segment_samples is not None:
+        frame_count += segment_samples
+
+    # Slides are written in the background while later frames are read; see slide_writer.SlideWriter
+    writer = slide_writer.SlideWriter(SLIDE_WRITE_WORKERS)
+
+    def save_checkpoint(done_before_index, status="in_progress"):
+        writer.wait() # The manifest only lists slides that are on disk
+        pages = [slide.as_dict() for slide in selector.slides]
+        checkpointer.save(done_before_index, FRAME_INTERVAL_SECONDS, frame_count, pages, selector.state(), status)
     
-    # Text extraction for each unique slide will be accumulated
-    video_extracted_texts = []
-
-    for i, frame_file in enumerate(frame_files):
-        current_frame_path = os.path.join(temp_video_frames_dir, frame_file)
-        current_page_number = get_page_number_from_image(current_frame_path)
-
-        # Handle cases where page number cannot be read
-        if current_page_number is None:
-            # If it's the first frame and no number, or if we cannot read a number,
-            # we might still want to consider it if a previous page number was valid.
-            # For simplicity, if we can't read, we'll treat it as 'no change' for now,
-            # or you could try to pick it if the previous was valid.
-            print(f"Warning: Could not read page number from {frame_file}. Skipping comparison for this frame.")
-            continue # Move to the next frame
-
-        # Logic for comparing page numbers
-        if current_page_number > previous_page_number:
-            # New page detected or first frame of a new sequence
-            if i == 0 or current_image_path is not None:
-                # If it's the very first frame or we have a valid previous image, copy it.
-                # Copy the *previous* identified unique slide if it exists
-                # Or copy the current if it's the first actual valid page.
-                
-                # Let's simplify: always copy the *current* frame if its page number is greater
-                # than the previously recognized page number. This ensures we pick the *first*
-                # instance of a new page.
-                unique_slide_name = f"{video_name}_page_{current_page_number}_{os.path.basename(current_frame_path)}"
+    # Text extraction for each unique slide would be accumulated here if the full-text OCR
+    # below is turned back on
+    # video_extracted_texts = []
+
+    try:
+        for frame, current_page_number in page_numbers:
+            if checkpointer is not None and checkpointer.due():
+                save_checkpoint(frame.index) # Every frame before this one is done
+            next_index = frame.index + 1
+            if segment_samples is None:
+                frame_count += 1
+            frame_file = frame_stream.frame_filename(frame.index)
+
+            # Handle cases where page number cannot be read
+            if current_page_number is None:
+                recorder.count("frames_without_page_number")
+                # If it's the first frame and no number, or if we cannot read a number,
+                # we might still want to consider it if a previous page number was valid.
+                # For simplicity, if we can't read, we'll treat it as 'no change' for now,
+                # or you could try to pick it if the previous was valid.
+                print(f"Warning: Could not read page number from {frame_file}. Skipping comparison for this frame.")
+                continue # Move to the next frame
+
+            # A frame is emitted when its page number is greater than the previously recognized
+            # page number, which picks the *first* instance of a new page. Smaller numbers are
+            # likely a misread or a loop in the video and are ignored. Only emitted frames get
+            # encoded to disk.
+            emitted, _ = selector.add(frame, current_page_number)
+            for slide in emitted:
+                unique_slide_name = slide_writer.slide_file_name(
+                    f"{video_name}_page_{current_page_number}_{os.path.splitext(frame_file)[0]}", SLIDE_FORMAT)
                 destination_path = os.path.join(OUTPUT_UNIQUE_SLIDES_FOLDER, unique_slide_name)
-                shutil.copy2(current_frame_path, destination_path)
-                print(f"Copied unique slide: {unique_slide_name} (Page: {current_page_number})")
+                writer.submit(destination_path, save_unique_slide, frame, video_full_path, destination_path,
+                              frames_are_rois, recorder)
+                print(f"Writing unique slide: {unique_slide_name} (Page: {current_page_number}, "
+                      f"at {frame.timestamp:.1f} s)")
+                slide.frame = frame._replace(image=None) # The writer holds the pixels until they are on disk
+                slide.file = destination_path
 
                 # # Also perform OCR on this unique slide for full text extraction
-                # full_text = pytesseract.image_to_string(Image.open(current_frame_path))
+                # full_text = pytesseract.image_to_string(Image.open(destination_path))
                 # if full_text:
                 #     clean_text = "\n".join([line.strip() for line in full_text.split('\n') if line.strip()])
                 #     if clean_text:
                 #         video_extracted_texts.append(f"--- Unique Slide: {unique_slide_name} (Page: {current_page_number}) ---\n{clean_text}\n")
-                
-            previous_page_number = current_page_number
-            current_image_path = current_frame_path # Set current for next comparison
-        elif current_page_number == previous_page_number:
-            # Page number is the same, just update current_image_path for the next iteration
-            current_image_path = current_frame_path
-        # If current_page_number < previous_page_number, it's likely a misread or a loop in video, ignore.
+    except ffmpeg.Error as e:
+        writer.close()
+        print(f"FFmpeg error for {video_full_path}:")
+        print(e.stderr.decode('utf8'))
+        print(f"Skipping {video_file} due to FFmpeg error during frame extraction.")
+        return
+    writer.close()
+
+    if frame_count == 0:
+        print(f"No frames extracted for {video_file}. Check video file or FRAME_INTERVAL_SECONDS.")
+        return
+
+    if gate is not None:
+        print(gate.summary())
+        recorder.count("ocr_calls_saved", gate.ocr_calls_saved)
+    if recognizer is not None:
+        print(recognizer.summary())
+
+    pack_slides(video_name, video_file, selector.slides, recorder)
+    if checkpointer is not None:
+        save_checkpoint(next_index, "complete")
 
     # # Save all extracted texts for the video
     # output_text_file = os.path.join(OUTPUT_TEXT_FOLDER, f"{video_name}_unique_slides_text.txt")
@@ -198,6 +782,28 @@ def process_video_for_unique_slides(video_file):
     # Clean up temporary frames for this video
     #shutil.rmtree(temp_video_frames_dir)
 
+    stats = {"frames": frame_count, "slides": len(selector.slides)}
+    if recognizer is not None:
+        stats["digit_templates"] = recognizer.stats()
+    return stats
+
+def process_video_for_unique_slides(video_file):
+    """
+    Runs find_unique_slides on one video, instrumented (and profiled with PROFILE_VIDEOS)
+    when INSTRUMENTATION_FOLDER is set. Returns its stats, with the stage timings and
+    counters under "instrumentation", or None if the video was skipped.
+    """
+    recorder = instrumentation.create_recorder(bool(INSTRUMENTATION_FOLDER))
+    if recorder.enabled and PROFILE_VIDEOS:
+        video_name = os.path.splitext(os.path.basename(video_file))[0]
+        with instrumentation.profiled(os.path.join(INSTRUMENTATION_FOLDER, f"{video_name}.prof")):
+            stats = find_unique_slides(video_file, recorder)
+    else:
+        stats = find_unique_slides(video_file, recorder)
+    if stats is not None and recorder.enabled:
+        stats["instrumentation"] = recorder.as_dict()
+    return stats
+
 # --- Main Execution ---
 if __name__ == "__main__":
     create_output_directories()
@@ -212,13 +818,32 @@ if __name__ == "__main__":
             print(f"No video files found in '{VIDEO_FOLDER}'. Please check the folder and file extensions.")
         else:
             print(f"Found {len(video_files)} video files to process.")
-            print("\n--- IMPORTANT: Adjust PAGE_NUMBER_REGION_WIDTH/HEIGHT/OFFSET_X/Y ---")
-            print("These values are critical for accurate page number detection.")
-            print("You may need to manually inspect a few frames to determine the correct crop box.")
-            print("------------------------------------------------------------------\n")
+            if ROI_CALIBRATION:
+                print("The page-number region is calibrated per resolution (ROI_CALIBRATION); "
+                      "PAGE_NUMBER_REGION_* is the fallback.\n")
+            else:
+                print("\n--- IMPORTANT: Adjust PAGE_NUMBER_REGION_WIDTH/HEIGHT/OFFSET_X/Y ---")
+                print("These values are critical for accurate page number detection.")
+                print("You may need to manually inspect a few frames to determine the correct crop box.")
+                print("------------------------------------------------------------------\n")
             
-            for video_file in video_files:
-                process_video_for_unique_slides(video_file)
+            if BATCH_CONCURRENT_VIDEOS > 1:
+                FFMPEG_THREADS, OCR_WORKERS = batch_scheduler.split_cores(BATCH_CONCURRENT_VIDEOS, BATCH_FFMPEG_SHARE)
+                print(f"Processing {BATCH_CONCURRENT_VIDEOS} videos at a time "
+                      f"({FFMPEG_THREADS} FFmpeg threads and {OCR_WORKERS} OCR workers each).")
+            batch_start = time.monotonic()
+            results = batch_scheduler.run_batch(VIDEO_FOLDER, video_files, process_video_for_unique_slides,
+                                                BATCH_CONCURRENT_VIDEOS)
+            batch_scheduler.print_summary(results, time.monotonic() - batch_start)
+            if OCR_CACHE_PATH:
+                print(ocr_cache.get_cache(OCR_CACHE_PATH, OCR_CACHE_MAX_ENTRIES).summary())
+            if DIGIT_TEMPLATES and OCR_EXECUTOR != "process":
+                digit_templates.print_summary(results)
+            if INSTRUMENTATION_FOLDER:
+                report_prefix = os.path.join(INSTRUMENTATION_FOLDER, time.strftime("slides_first_%Y%m%d_%H%M%S"))
+                instrumentation.print_report(results)
+                json_path, csv_path = instrumentation.write_report(results, report_prefix)
+                print(f"Instrumentation report written to {json_path} and {csv_path}")
     
     print("\nProcessing complete.")
    # clean_temp_frames() # Final cleanup of the main temp frames folder
\ No newline at end of file
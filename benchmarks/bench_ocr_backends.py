@@ -0,0 +1,118 @@
+"""
+Compares per-crop OCR latency of the backends in slide_pipeline/ocr_backends.py.
+
+Usage:
+    python benchmarks/bench_ocr_backends.py [folder_of_page_number_crops]
+
+Without a folder, synthetic page-number crops (150x80, black digits on white)
+are drawn with Pillow, so the reported accuracy is against known numbers.
+With a folder (e.g. crops saved via the debug lines in get_page_number_from_image)
+the PNG/JPG files there are used and only latency is reported.
+"""
+import os
+import re
+import statistics
+import sys
+import time
+
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from slide_pipeline import ocr_backends
+
+# --- Configuration ---
+PYTESSERACT_PATH = None # Set to your tesseract executable if it is not on PATH
+OCR_CONFIG = '--psm 6 -c tessedit_char_whitelist=0123456789'
+SYNTHETIC_CROPS = 64
+CROP_SIZE = (150, 80)
+TILED_BATCH_SIZES = (8, 32)
+
+
+def synthetic_crops(count):
+    """Returns [(image, page_number)] of plain page-number crops."""
+    try:
+        font = ImageFont.load_default(size=40)
+    except TypeError: # Pillow < 10.1 has no sized default font
+        font = ImageFont.load_default()
+    crops = []
+    for page_number in range(1, count + 1):
+        image = Image.new('L', CROP_SIZE, 255)
+        ImageDraw.Draw(image).text((20, 15), str(page_number), fill=0, font=font)
+        crops.append((image, page_number))
+    return crops
+
+
+def folder_crops(folder):
+    """Returns [(image, None)] for every PNG/JPG in `folder`."""
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(('.png', '.jpg')))
+    return [(Image.open(os.path.join(folder, f)).convert('L'), None) for f in files]
+
+
+def parse_page_number(text):
+    numbers = re.findall(r'\d+', text)
+    return int(numbers[0]) if numbers else None
+
+
+def accuracy(texts, crops):
+    expected = [page_number for _, page_number in crops]
+    if None in expected:
+        return None
+    correct = sum(1 for text, page_number in zip(texts, expected) if parse_page_number(text) == page_number)
+    return correct / len(expected)
+
+
+def bench_per_call(backend, crops):
+    """Times image_to_string once per crop. Returns (latencies, texts)."""
+    backend.image_to_string(crops[0][0], OCR_CONFIG) # Warm-up (engine start, file cache)
+    latencies, texts = [], []
+    for image, _ in crops:
+        start = time.perf_counter()
+        texts.append(backend.image_to_string(image, OCR_CONFIG))
+        latencies.append(time.perf_counter() - start)
+    return latencies, texts
+
+
+def bench_tiled(backend, crops, batch_size):
+    """Times images_to_strings per batch; each crop's latency is its batch's share."""
+    backend.images_to_strings([crops[0][0]], OCR_CONFIG)
+    latencies, texts = [], []
+    for i in range(0, len(crops), batch_size):
+        batch = [image for image, _ in crops[i:i + batch_size]]
+        start = time.perf_counter()
+        texts.extend(backend.images_to_strings(batch, OCR_CONFIG))
+        elapsed = time.perf_counter() - start
+        latencies.extend([elapsed / len(batch)] * len(batch))
+    return latencies, texts
+
+
+def print_row(label, latencies, texts, crops):
+    acc = accuracy(texts, crops)
+    acc_text = f"{acc * 100:6.1f}%" if acc is not None else "      -"
+    print(f"{label:<24} {len(latencies):>6} {sum(latencies):>8.2f} "
+          f"{statistics.mean(latencies) * 1000:>10.2f} {statistics.median(latencies) * 1000:>10.2f} {acc_text:>9}")
+
+
+if __name__ == "__main__":
+    import pytesseract
+    if PYTESSERACT_PATH:
+        pytesseract.pytesseract.tesseract_cmd = PYTESSERACT_PATH
+
+    crops = folder_crops(sys.argv[1]) if len(sys.argv) > 1 else synthetic_crops(SYNTHETIC_CROPS)
+    if not crops:
+        sys.exit("No crops to benchmark.")
+
+    print(f"{'Backend':<24} {'Crops':>6} {'Total s':>8} {'Mean ms':>10} {'Median ms':>10} {'Accuracy':>9}")
+    print("-" * 72)
+
+    latencies, texts = bench_per_call(ocr_backends.PytesseractBackend(), crops)
+    print_row("pytesseract", latencies, texts, crops)
+
+    try:
+        latencies, texts = bench_per_call(ocr_backends.TesserocrBackend(), crops)
+        print_row("tesserocr", latencies, texts, crops)
+    except ImportError as e:
+        print(f"{'tesserocr':<24} skipped: {e}")
+
+    for batch_size in TILED_BATCH_SIZES:
+        latencies, texts = bench_tiled(ocr_backends.TiledBackend(batch_size=batch_size), crops, batch_size)
+        print_row(f"tiled (batch {batch_size})", latencies, texts, crops)
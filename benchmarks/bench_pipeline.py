@@ -0,0 +1,317 @@
+"""
+End-to-end benchmark of the unique-slide scripts (3.py and 4.py) on synthetic lecture videos.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--scripts 3 4] [--set NAME=VALUE ...] [--output results.json]
+
+The videos are generated locally with FFmpeg's lavfi sources: a known sequence of
+slides, each with its page number drawn by drawtext inside the page-number region
+the scripts crop, at several resolutions and lengths (see VIDEO_CASES). They are
+cached in --videos-dir, so later runs measure the same input.
+
+Every (script, video) pair runs process_video_for_unique_slides in a fresh process
+and records wall time, frames/s, OCR calls, time per stage, peak RSS (Python and
+FFmpeg), temp disk usage, and precision/recall of the saved slides against the
+ground truth. The stage times come in two sets: "stage_seconds" times the
+extract, ocr and save functions from outside, and "pipeline_stage_seconds" holds
+every stage the scripts' own instrumentation times (probe, calibrate, decode,
+crop, preprocess, ocr, fetch_frame, write_slide, pack_slides, ...). Both are
+summed over workers, so they can add up to more than the wall time. `--set` overrides a script setting for every run, e.g.
+`--set SAMPLING_MODE=scene --set OCR_WORKERS=4`. Settings that start worker
+processes (SEGMENT_WORKERS above 1, OCR_EXECUTOR "process") are rejected: the
+workers import the script afresh and would run with its defaults. The results are written as JSON so
+runs can be compared over time; a summary table is printed as well.
+
+Needs an FFmpeg build with drawtext (libfreetype) and Tesseract, like the scripts.
+"""
+import argparse
+import ast
+import datetime
+import importlib.util
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import ffmpeg
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+try:
+    import resource
+except ImportError: # Windows: peak RSS is not reported
+    resource = None
+
+# --- Configuration ---
+PYTESSERACT_PATH = None # Set to your tesseract executable if it is not on PATH
+FONT_FILE = None # A .ttf for drawtext if FFmpeg cannot find a default font (no fontconfig)
+VIDEO_FPS = 10
+# (width, height, slide_count, slide_seconds)
+VIDEO_CASES = [
+    (640, 360, 10, 6),
+    (1280, 720, 20, 8),
+    (1920, 1080, 30, 10),
+]
+# Settings applied to every run on top of the scripts' defaults: results must not
+# come from an earlier run's OCR cache, manifests or ROI calibration.
+BASE_SETTINGS = {
+    "OCR_CACHE_PATH": None,
+    "MANIFEST_FOLDER": None,
+    "ROI_CALIBRATION_CACHE_PATH": None,
+}
+
+
+def load_script(script):
+    """Imports 3.py or 4.py as a module."""
+    path = os.path.join(REPO_ROOT, f"{script}.py")
+    spec = importlib.util.spec_from_file_location(f"slides_{script}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def video_file_name(width, height, slide_count, slide_seconds):
+    return f"synthetic_{width}x{height}_{slide_count}x{slide_seconds}s.mp4"
+
+
+def generate_video(path, width, height, slide_count, slide_seconds, crop_box):
+    """
+    Renders `slide_count` slides of `slide_seconds` each: a title and a body line
+    that change with every slide, and the page number centred in `crop_box`.
+    """
+    page = f"%{{eif:trunc(t/{slide_seconds})+1:d}}"
+    font = {'fontfile': FONT_FILE} if FONT_FILE else {}
+    left, upper, right, lower = crop_box
+    stream = (
+        ffmpeg
+        .input(f"color=c=white:s={width}x{height}:r={VIDEO_FPS}:d={slide_count * slide_seconds}", f='lavfi')
+        # .filter rather than .drawtext: the latter escapes the '%' of the page-number expansion
+        .filter('drawtext', text=f"Slide {page}", x='(w-text_w)/2', y='h/5', fontsize=height // 10,
+                fontcolor='navy', **font)
+        .filter('drawtext', text=f"Topic {page} covers point {page}", x='w/10', y='h/2', fontsize=height // 20,
+                fontcolor='black', **font)
+        .filter('drawtext', text=page, x=f'{left}+({right - left}-text_w)/2', y=f'{upper}+({lower - upper}-text_h)/2',
+                fontsize=int((lower - upper) * 0.6), fontcolor='black', **font)
+        .output(path, vcodec='libx264', pix_fmt='yuv420p', preset='veryfast', tune='stillimage')
+        .global_args('-loglevel', 'error')
+        .overwrite_output()
+    )
+    stream.run()
+
+
+def ensure_videos(videos_dir, crop_box_for):
+    """Generates the VIDEO_CASES videos that are not in `videos_dir` yet. Returns [(path, case)]."""
+    os.makedirs(videos_dir, exist_ok=True)
+    videos = []
+    for case in VIDEO_CASES:
+        width, height, slide_count, slide_seconds = case
+        path = os.path.join(videos_dir, video_file_name(*case))
+        if not os.path.exists(path):
+            print(f"Generating {path}...")
+            generate_video(path, width, height, slide_count, slide_seconds, crop_box_for(width, height))
+        videos.append((path, case))
+    return videos
+
+
+def folder_size(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        total += sum(os.path.getsize(os.path.join(root, f)) for f in files)
+    return total
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size in MB of this process, or of the largest of its children (FFmpeg)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def score_slides(saved_timestamps, slide_count, slide_seconds):
+    """Returns (precision, recall): a saved slide is correct if it shows a page no earlier slide showed."""
+    pages_found = set()
+    correct = 0
+    for timestamp in saved_timestamps:
+        page = int(timestamp // slide_seconds) + 1
+        if page <= slide_count and page not in pages_found:
+            pages_found.add(page)
+            correct += 1
+    precision = correct / len(saved_timestamps) if saved_timestamps else 0.0
+    return precision, len(pages_found) / slide_count
+
+
+def check_overrides(overrides):
+    """
+    Raises ValueError for overrides the benchmark cannot apply: the worker processes of
+    SEGMENT_WORKERS > 1 and OCR_EXECUTOR "process" import the script again, so they would
+    see neither the overrides nor the stage timers set up in run_case.
+    """
+    if overrides.get("SEGMENT_WORKERS", 1) > 1:
+        raise ValueError("SEGMENT_WORKERS above 1 cannot be benchmarked: the segment workers would run with "
+                         "the script's default settings")
+    if overrides.get("OCR_EXECUTOR", "thread") == "process":
+        raise ValueError('OCR_EXECUTOR="process" cannot be benchmarked: the OCR workers would run with '
+                         "the script's default settings")
+
+
+def run_case(script, video_path, case, overrides):
+    """Runs one script on one video in this process and returns its measurements."""
+    check_overrides(overrides)
+    width, height, slide_count, slide_seconds = case
+    work_dir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    module = load_script(script)
+    module.pytesseract.pytesseract.tesseract_cmd = PYTESSERACT_PATH or 'tesseract'
+    module.VIDEO_FOLDER = os.path.dirname(video_path)
+    module.OUTPUT_UNIQUE_SLIDES_FOLDER = os.path.join(work_dir, "slides")
+    module.TEMP_FRAMES_FOLDER = os.path.join(work_dir, "temp_frames")
+    for name, value in {**BASE_SETTINGS, **overrides}.items():
+        setattr(module, name, value)
+    # The scripts' own stage timings, returned with the result; nothing is written there
+    module.INSTRUMENTATION_FOLDER = work_dir
+    module.PROFILE_VIDEOS = False
+    module.create_output_directories()
+
+    # Wrap the stage functions to count calls and time them (summed over OCR workers)
+    stats_lock = threading.Lock()
+    stage_seconds = {"extract": 0.0, "ocr": 0.0, "save": 0.0}
+    counters = {"ocr_calls": 0, "temp_disk_bytes": 0}
+    saved_timestamps = {}
+
+    def timed(stage, function, after=None):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            with stats_lock:
+                stage_seconds[stage] += time.perf_counter() - start
+                if after is not None:
+                    after(args, result)
+            return result
+        return wrapper
+
+    def count_ocr(args, result):
+        counters["ocr_calls"] += 1
+
+    def measure_temp(args, result):
+        counters["temp_disk_bytes"] = max(counters["temp_disk_bytes"], folder_size(args[1]))
+
+    def record_slide(args, result):
+        frame, destination_path = args[0], args[2]
+        saved_timestamps[os.path.abspath(destination_path)] = frame.timestamp
+
+    module.extract_frames = timed("extract", module.extract_frames, measure_temp)
+    module.get_page_number_from_roi = timed("ocr", module.get_page_number_from_roi, count_ocr)
+    module.save_unique_slide = timed("save", module.save_unique_slide, record_slide)
+
+    start = time.perf_counter()
+    result = module.process_video_for_unique_slides(os.path.basename(video_path))
+    wall_seconds = time.perf_counter() - start
+
+    # Slides 4.py knocked out again are gone from disk, so score what is left
+    slides_folder = module.OUTPUT_UNIQUE_SLIDES_FOLDER
+    kept = [saved_timestamps[os.path.abspath(os.path.join(slides_folder, f))] for f in os.listdir(slides_folder)
+            if os.path.abspath(os.path.join(slides_folder, f)) in saved_timestamps]
+    precision, recall = score_slides(sorted(kept), slide_count, slide_seconds)
+    frames = result["frames"] if result else 0
+    measurement = {
+        "script": f"{script}.py",
+        "video": os.path.basename(video_path),
+        "width": width,
+        "height": height,
+        "slide_count": slide_count,
+        "slide_seconds": slide_seconds,
+        "status": "ok" if result else "skipped",
+        "wall_seconds": wall_seconds,
+        "frames": frames,
+        "frames_per_second": frames / wall_seconds if wall_seconds > 0 else None,
+        "ocr_calls": counters["ocr_calls"],
+        "stage_seconds": stage_seconds,
+        "pipeline_stage_seconds": (result["instrumentation"]["stage_seconds"]
+                                   if result and result.get("instrumentation") else None),
+        "peak_rss_mb": peak_rss_mb(),
+        "ffmpeg_peak_rss_mb": peak_rss_mb(children=True),
+        "temp_disk_bytes": counters["temp_disk_bytes"],
+        "output_disk_bytes": folder_size(slides_folder),
+        "slides_saved": len(kept),
+        "precision": precision,
+        "recall": recall,
+    }
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return measurement
+
+
+def parse_overrides(assignments):
+    """Turns ["NAME=VALUE", ...] into a dict, reading VALUE as a Python literal when possible."""
+    overrides = {}
+    for assignment in assignments:
+        name, _, value = assignment.partition('=')
+        try:
+            overrides[name] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            overrides[name] = value
+    return overrides
+
+
+def print_table(runs):
+    header = (f"{'Script':<6} {'Video':<34} {'Wall s':>8} {'Frames/s':>9} {'OCR':>5} {'OCR s':>7} "
+              f"{'RSS MB':>7} {'Temp MB':>8} {'Prec':>6} {'Recall':>6}")
+    print("\n" + header)
+    print("-" * len(header))
+    for r in runs:
+        rss = f"{r['peak_rss_mb']:7.0f}" if r['peak_rss_mb'] is not None else "      -"
+        fps = f"{r['frames_per_second']:9.2f}" if r['frames_per_second'] is not None else "        -"
+        print(f"{r['script']:<6} {r['video'][:34]:<34} {r['wall_seconds']:8.2f} {fps} {r['ocr_calls']:5d} "
+              f"{r['stage_seconds']['ocr']:7.2f} {rss} {r['temp_disk_bytes'] / 1e6:8.1f} "
+              f"{r['precision']:6.2f} {r['recall']:6.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--scripts", nargs="+", default=["3", "4"], help="Scripts to run (3 and/or 4)")
+    parser.add_argument("--set", dest="overrides", action="append", default=[], metavar="NAME=VALUE",
+                        help="Override a script setting for every run")
+    parser.add_argument("--videos-dir", default=os.path.join(tempfile.gettempdir(), "slide_bench_videos"),
+                        help="Where the synthetic videos are generated and cached")
+    parser.add_argument("--output", default=None,
+                        help="JSON results file (default: bench_pipeline_<date>_<time>.json)")
+    args = parser.parse_args()
+    overrides = parse_overrides(args.overrides)
+    try:
+        check_overrides(overrides)
+    except ValueError as e:
+        parser.error(str(e))
+
+    # The page number has to land in the region the scripts crop, as configured: BASE_SETTINGS
+    # keep a calibration cache in the working directory from moving it
+    reference = load_script(args.scripts[0])
+    for name, value in {**BASE_SETTINGS, **overrides}.items():
+        setattr(reference, name, value)
+    videos = ensure_videos(args.videos_dir, reference.get_page_number_crop_box)
+
+    runs = []
+    context = multiprocessing.get_context("spawn") # A fresh process per run, so peak RSS is per run
+    for video_path, case in videos:
+        for script in args.scripts:
+            print(f"Running {script}.py on {os.path.basename(video_path)}...")
+            with context.Pool(1) as pool:
+                runs.append(pool.apply(run_case, (script, video_path, case, overrides)))
+
+    results = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpu_count": os.cpu_count(),
+        "overrides": overrides,
+        "runs": runs,
+    }
+    output = args.output or datetime.datetime.now().strftime("bench_pipeline_%Y%m%d_%H%M%S.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print_table(runs)
+    print(f"\nResults written to {output}")
@@ -0,0 +1,3 @@
+"""
+Shared helpers for the unique-slide extraction scripts (3.py and 4.py).
+"""
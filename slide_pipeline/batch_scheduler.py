@@ -0,0 +1,104 @@
+"""
+Processes several videos of a folder at once.
+
+While one video sits in FFmpeg decode its OCR workers are idle, and the other
+way round, so running a few videos side by side keeps every core busy. Jobs
+are started longest-first so one long lecture does not end up running alone
+at the end of the batch, and a failing video never stalls the others.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from slide_pipeline import frame_stream
+
+
+def split_cores(concurrent_videos, ffmpeg_share=0.25, cpu_count=None):
+    """
+    Splits the machine's cores between `concurrent_videos` jobs.
+    Returns (ffmpeg_threads, ocr_workers) for each job; `ffmpeg_share` is the
+    fraction of a job's cores given to FFmpeg decoding, the rest go to OCR.
+    """
+    cores = cpu_count or os.cpu_count() or 1
+    cores_per_video = max(1, cores // max(1, concurrent_videos))
+    ffmpeg_threads = max(1, round(cores_per_video * ffmpeg_share))
+    ocr_workers = max(1, cores_per_video - ffmpeg_threads)
+    return ffmpeg_threads, ocr_workers
+
+
+def video_duration(video_path):
+    """Returns the duration of a video in seconds, or None if it cannot be probed."""
+    try:
+        return frame_stream.probe_video(video_path)[2]
+    except Exception:
+        return None
+
+
+def order_longest_first(video_folder, video_files):
+    """
+    Returns [(video_file, duration_seconds)] sorted longest first. Videos that
+    cannot be probed are ordered by file size after the probed ones.
+    """
+    jobs = []
+    for video_file in video_files:
+        video_path = os.path.join(video_folder, video_file)
+        jobs.append((video_file, video_duration(video_path), os.path.getsize(video_path)))
+    jobs.sort(key=lambda job: (job[1] is not None, job[1] or 0, job[2]), reverse=True)
+    return [(video_file, duration) for video_file, duration, _ in jobs]
+
+
+def _run_job(process_video, video_file, duration):
+    result = {"video": video_file, "duration": duration, "status": "ok", "frames": None, "slides": None}
+    start = time.monotonic()
+    try:
+        stats = process_video(video_file)
+        if stats is None:
+            result["status"] = "skipped"
+        else:
+            result.update(stats)
+    except Exception as e:
+        print(f"Error processing {video_file}: {e}")
+        result["status"] = f"error: {e}"
+    result["wall_seconds"] = time.monotonic() - start
+    return result
+
+
+def run_batch(video_folder, video_files, process_video, max_concurrent):
+    """
+    Runs `process_video(video_file)` for every video, `max_concurrent` at a
+    time, longest first. `process_video` returns a dict of stats (at least
+    "frames" and "slides", optionally a "status" such as "unchanged") or None
+    if it skipped the video; exceptions are
+    caught and recorded per video. Returns one result dict per video, in the
+    order the jobs were started.
+    """
+    jobs = order_longest_first(video_folder, video_files)
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrent)) as pool:
+        futures = [pool.submit(_run_job, process_video, video_file, duration) for video_file, duration in jobs]
+        return [future.result() for future in futures]
+
+
+def print_summary(results, batch_seconds):
+    """Prints a throughput table for the results returned by run_batch."""
+    def cell(value, fmt, width):
+        return format(value, fmt) if value is not None else "-".rjust(width)
+
+    header = (f"{'Video':<40} {'Status':<10} {'Length s':>9} {'Wall s':>8} {'Frames':>7} "
+              f"{'Frames/s':>9} {'Slides':>7} {'Speed':>7}")
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        wall = r["wall_seconds"]
+        # Throughput only for videos that were read; an unchanged one reports its old frame count
+        frames_per_second = speed = None
+        if r["status"] == "ok" and wall > 0:
+            if r["frames"] is not None:
+                frames_per_second = r["frames"] / wall
+            if r["duration"] is not None:
+                speed = f"{r['duration'] / wall:.1f}x"
+        print(f"{r['video'][:40]:<40} {r['status'][:10]:<10} {cell(r['duration'], '9.1f', 9)} {wall:8.1f} "
+              f"{cell(r['frames'], '7d', 7)} {cell(frames_per_second, '9.2f', 9)} {cell(r['slides'], '7d', 7)} "
+              f"{cell(speed, '>7', 7)}")
+    unchanged = sum(1 for r in results if r["status"] == "unchanged")
+    failed = sum(1 for r in results if r["status"] not in ("ok", "unchanged"))
+    print(f"{len(results)} videos in {batch_seconds:.1f} s, {unchanged} unchanged, {failed} skipped or failed")
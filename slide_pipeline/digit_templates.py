@@ -0,0 +1,213 @@
+"""
+Page-number reading by digit templates, with Tesseract as the fallback.
+
+All page numbers of a deck share one font and size. So once Tesseract has
+read a few crops of a video, its digits can be recognised by comparing their
+glyphs with templates cut from those reads. That costs a fraction of a
+millisecond instead of a Tesseract call.
+
+A crop is binarized at its Otsu level, with the minority side as ink. It is
+then cut into glyphs at the empty columns between them, and each glyph is
+scaled to GLYPH_SIZE. Every glyph of a crop is scored at once against every
+digit template by normalized correlation (one matrix product).
+
+A crop goes to Tesseract instead when any glyph has no template, scores
+below MIN_SCORE or is too close to a second digit. A Tesseract read whose
+number has as many digits as the crop has glyphs becomes a set of template
+samples. Every `verify_every`-th template read is also sent to Tesseract,
+and the agreement rate is the recognizer's accuracy estimate.
+"""
+import threading
+
+import numpy as np
+from PIL import Image
+
+from slide_pipeline import preprocess
+
+# (width, height) every glyph is scaled to before it is compared
+GLYPH_SIZE = (12, 18)
+# Lowest correlation (0.0-1.0) with the best template for a glyph to count as recognised
+MIN_SCORE = 0.9
+# How much better the best template has to score than the runner-up
+MIN_MARGIN = 0.05
+# Largest difference in width/height ratio (as a log) between a glyph and its template
+MAX_ASPECT_LOG_RATIO = 0.35
+# Glyphs shorter than this fraction of the tallest one are specks (or punctuation) and dropped
+MIN_GLYPH_HEIGHT_FRACTION = 0.4
+# Samples averaged into a template at most; later reads no longer move it
+MAX_SAMPLES_PER_DIGIT = 20
+
+
+def _runs(flags):
+    """Returns [(start, end)] of the runs of True in a 1-D bool array."""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], flags.astype(np.int8), [0]))))
+    return list(zip(edges[::2], edges[1::2]))
+
+
+def ink_mask(crop):
+    """Returns the bool ink pixels of a crop (PIL image or NumPy array): the minority side of its Otsu level."""
+    gray = preprocess.to_gray(preprocess.as_array(crop)[None])
+    dark = gray[0] < preprocess.otsu_levels(gray)[0]
+    return dark if np.count_nonzero(dark) * 2 <= dark.size else ~dark
+
+
+def segment(ink):
+    """Returns the ink of each glyph, left to right, cut at the columns without ink and trimmed to its rows."""
+    glyphs = []
+    for left, right in _runs(ink.any(axis=0)):
+        rows = np.flatnonzero(ink[:, left:right].any(axis=1))
+        glyphs.append(ink[rows[0]:rows[-1] + 1, left:right])
+    if not glyphs:
+        return []
+    tallest = max(glyph.shape[0] for glyph in glyphs)
+    return [glyph for glyph in glyphs if glyph.shape[0] >= tallest * MIN_GLYPH_HEIGHT_FRACTION]
+
+
+def glyph_features(glyphs):
+    """Returns (vectors, log aspect ratios): each glyph scaled to GLYPH_SIZE as a zero-mean unit vector."""
+    vectors = np.empty((len(glyphs), GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32)
+    for i, glyph in enumerate(glyphs):
+        scaled = Image.fromarray(glyph.astype(np.uint8) * 255).resize(GLYPH_SIZE, Image.BILINEAR)
+        vectors[i] = np.asarray(scaled, dtype=np.float32).ravel()
+    vectors -= vectors.mean(axis=1, keepdims=True)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1.0)
+    aspects = np.log(np.array([glyph.shape[1] / glyph.shape[0] for glyph in glyphs], dtype=np.float32))
+    return vectors, aspects
+
+
+class DigitRecognizer:
+    """
+    Templates learned from the Tesseract reads of one video, with counts of
+    how page numbers were read. Safe to share between OCR worker threads.
+    """
+
+    def __init__(self, verify_every=20):
+        self.verify_every = verify_every
+        self.template_reads = 0
+        self.fallbacks = 0
+        self.verified = 0
+        self.agreed = 0
+        self._lock = threading.Lock()
+        self._digits_learned_elsewhere = set() # By the recognizers whose counts were added
+        self._sums = {} # digit -> (sum of sample vectors, sum of log aspects, count)
+        # (digits, templates, log aspects), replaced as a whole so readers never see a half-updated set
+        self._model = (np.empty(0, dtype=np.int64), np.empty((0, GLYPH_SIZE[0] * GLYPH_SIZE[1]), dtype=np.float32),
+                       np.empty(0, dtype=np.float32))
+
+    def recognize(self, crop):
+        """Returns the page number read from the templates, or None if any glyph is unknown or doubtful."""
+        digits, templates, aspects = self._model
+        if len(digits) == 0:
+            return None
+        glyphs = segment(ink_mask(crop))
+        if not glyphs:
+            return None
+        vectors, glyph_aspects = glyph_features(glyphs)
+        scores = vectors @ templates.T
+        scores[np.abs(glyph_aspects[:, None] - aspects[None, :]) > MAX_ASPECT_LOG_RATIO] = -1.0
+        order = np.argsort(scores, axis=1)
+        best = np.take_along_axis(scores, order[:, -1:], axis=1)[:, 0]
+        runner_up = np.take_along_axis(scores, order[:, -2:-1], axis=1)[:, 0] if len(digits) > 1 else best - 1.0
+        if np.any(best < MIN_SCORE) or np.any(best - runner_up < MIN_MARGIN):
+            return None
+        return int("".join(str(digit) for digit in digits[order[:, -1]]))
+
+    def learn(self, crop, page_number):
+        """
+        Adds the glyphs of a crop Tesseract read as `page_number` to the templates,
+        if the crop has exactly one glyph per digit. Returns whether it did.
+        """
+        if page_number is None or page_number < 0:
+            return False
+        text = str(page_number)
+        glyphs = segment(ink_mask(crop))
+        if len(glyphs) != len(text):
+            return False
+        vectors, glyph_aspects = glyph_features(glyphs)
+        with self._lock:
+            changed = False
+            for digit, vector, aspect in zip(text, vectors, glyph_aspects):
+                vector_sum, aspect_sum, count = self._sums.get(int(digit), (0.0, 0.0, 0))
+                if count < MAX_SAMPLES_PER_DIGIT:
+                    self._sums[int(digit)] = (vector_sum + vector, aspect_sum + aspect, count + 1)
+                    changed = True
+            if changed:
+                self._rebuild()
+        return True
+
+    def _rebuild(self):
+        digits = sorted(self._sums)
+        templates = np.stack([self._sums[digit][0] for digit in digits]).astype(np.float32)
+        templates -= templates.mean(axis=1, keepdims=True)
+        templates /= np.maximum(np.linalg.norm(templates, axis=1, keepdims=True), 1e-6)
+        aspects = np.array([self._sums[digit][1] / self._sums[digit][2] for digit in digits], dtype=np.float32)
+        self._model = (np.array(digits, dtype=np.int64), templates, aspects)
+
+    def wrap(self, read_page_number):
+        """
+        Returns a function with the same (crop, frame_label) signature as
+        `read_page_number` (the Tesseract read) that tries the templates first.
+        """
+        def read(crop, frame_label=None):
+            page_number = self.recognize(crop)
+            if page_number is not None:
+                with self._lock:
+                    self.template_reads += 1
+                    verify = self.verify_every and self.template_reads % self.verify_every == 0
+                if not verify:
+                    return page_number
+                tesseract_page_number = read_page_number(crop, frame_label)
+                with self._lock:
+                    self.verified += 1
+                    self.agreed += tesseract_page_number == page_number
+                if tesseract_page_number != page_number:
+                    self.learn(crop, tesseract_page_number)
+                return tesseract_page_number
+            with self._lock:
+                self.fallbacks += 1
+            tesseract_page_number = read_page_number(crop, frame_label)
+            self.learn(crop, tesseract_page_number)
+            return tesseract_page_number
+        return read
+
+    def add_counts(self, stats):
+        """Adds the read counts of another recognizer's stats(), e.g. one that ran in a worker process."""
+        with self._lock:
+            self.template_reads += stats["template_reads"]
+            self.fallbacks += stats["fallbacks"]
+            self.verified += stats["verified"]
+            self.agreed += stats["agreed"]
+            self._digits_learned_elsewhere.update(stats["digits_learned"])
+
+    def stats(self):
+        """Returns the counts as a JSON-serialisable dict."""
+        with self._lock:
+            digits_learned = self._digits_learned_elsewhere.union(int(digit) for digit in self._model[0])
+            return {"template_reads": self.template_reads, "fallbacks": self.fallbacks,
+                    "verified": self.verified, "agreed": self.agreed, "digits_learned": sorted(digits_learned)}
+
+    def summary(self):
+        """Returns a one-line report of how many page numbers the templates read and how accurately."""
+        return _summary_line(self.stats())
+
+
+def _summary_line(stats):
+    total = stats["template_reads"] + stats["fallbacks"]
+    read_percent = 100.0 * stats["template_reads"] / total if total else 0.0
+    line = (f"Digit templates: {stats['template_reads']} of {total} page numbers read without Tesseract "
+            f"({read_percent:.1f}%)")
+    if stats["verified"]:
+        line += (f", {stats['agreed']} of {stats['verified']} checks agreed with Tesseract "
+                 f"({100.0 * stats['agreed'] / stats['verified']:.1f}%)")
+    return line
+
+
+def print_summary(results):
+    """Prints the template reads and agreement with Tesseract summed over a batch's per-video results."""
+    totals = {"template_reads": 0, "fallbacks": 0, "verified": 0, "agreed": 0}
+    for r in results:
+        for key, value in (r.get("digit_templates") or {}).items():
+            if key in totals:
+                totals[key] += value
+    print(_summary_line(totals))
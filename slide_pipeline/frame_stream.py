@@ -0,0 +1,348 @@
+"""
+Streams decoded frames out of FFmpeg instead of writing PNGs to temp_frames.
+
+FFmpeg writes raw RGB frames to a pipe and the generators below yield them one
+at a time as NumPy arrays. Only the frames chosen as unique slides are ever
+encoded to disk, and since the pipe blocks FFmpeg until we have read the
+previous frame, memory stays at roughly one frame however long the video is.
+"""
+import collections
+import fractions
+import os
+import queue
+import re
+import shutil
+import threading
+
+import ffmpeg
+import numpy as np
+from PIL import Image
+
+# One sampled frame. `image` is an RGB array (height, width, 3); `path` is the
+# PNG on disk for frames coming from frames_from_folder, None for streamed ones.
+Frame = collections.namedtuple('Frame', ['index', 'timestamp', 'image', 'path'])
+
+
+def frame_filename(index):
+    """Returns the name FFmpeg's 'frame_%04d.png' pattern gives the frame at `index`."""
+    return f"frame_{index + 1:04d}.png"
+
+
+def to_pil_image(image):
+    """Returns `image` as a PIL image; accepts a file path, a PIL image or a NumPy array."""
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, np.ndarray):
+        return Image.fromarray(image)
+    return Image.open(image)
+
+
+def probe_video(video_path):
+    """Returns (width, height, duration_seconds) of the first video stream."""
+    info = ffmpeg.probe(video_path)
+    stream = next(s for s in info['streams'] if s['codec_type'] == 'video')
+    duration = float(stream.get('duration') or info['format'].get('duration') or 0)
+    return int(stream['width']), int(stream['height']), duration
+
+
+def _drain(pipe, chunks):
+    """Reads `pipe` to EOF so FFmpeg never blocks on a full stderr buffer."""
+    for chunk in iter(lambda: pipe.read(4096), b''):
+        chunks.append(chunk)
+
+
+_SHOWINFO_TIME_BASE = re.compile(rb'Parsed_showinfo.* config in time_base: (\d+)/(\d+)')
+_SHOWINFO_PTS = re.compile(rb'Parsed_showinfo.* pts:\s*(-?\d+)')
+
+
+def _drain_showinfo(pipe, chunks, timestamps):
+    """
+    Like _drain, but puts the presentation time (in seconds) of every frame the
+    showinfo filter logs on the `timestamps` queue, and None at EOF. The
+    showinfo lines themselves are left out of `chunks`.
+    """
+    time_base = None
+    try:
+        for line in iter(pipe.readline, b''):
+            match = _SHOWINFO_PTS.search(line)
+            if match and time_base is not None:
+                timestamps.put(float(int(match.group(1)) * time_base))
+                continue
+            match = _SHOWINFO_TIME_BASE.search(line)
+            if match:
+                time_base = fractions.Fraction(int(match.group(1)), int(match.group(2)))
+                continue
+            chunks.append(line)
+    finally:
+        timestamps.put(None)
+
+
+def read_raw_frames(stream, frame_shape, with_timestamps=False):
+    """
+    Runs an ffmpeg-python output `stream` that writes rawvideo to 'pipe:' and
+    yields one uint8 array of `frame_shape` per decoded frame.
+    With `with_timestamps`, the stream's last filter must be showinfo; its log
+    gives each frame's presentation time and (timestamp, array) pairs are yielded.
+    Raises ffmpeg.Error (with stderr attached) if FFmpeg exits with an error.
+    Closing the generator early kills the FFmpeg process.
+    """
+    frame_size = int(np.prod(frame_shape))
+    if with_timestamps:
+        # showinfo logs at info level; -nostats keeps the progress line out of the log
+        stream = stream.global_args('-hide_banner', '-nostats', '-loglevel', 'info')
+    else:
+        stream = stream.global_args('-loglevel', 'error')
+    process = stream.run_async(pipe_stdout=True, pipe_stderr=True)
+    stderr_chunks = []
+    timestamps = queue.Queue()
+    if with_timestamps:
+        stderr_thread = threading.Thread(target=_drain_showinfo, args=(process.stderr, stderr_chunks, timestamps),
+                                         daemon=True)
+    else:
+        stderr_thread = threading.Thread(target=_drain, args=(process.stderr, stderr_chunks), daemon=True)
+    stderr_thread.start()
+
+    finished = False
+    try:
+        while True:
+            buffer = process.stdout.read(frame_size)
+            if len(buffer) < frame_size:
+                break  # End of stream (a truncated trailing frame is dropped)
+            image = np.frombuffer(buffer, np.uint8).reshape(frame_shape)
+            if with_timestamps:
+                # showinfo logs a frame before FFmpeg writes it out, so its time is (about to be) queued
+                timestamp = timestamps.get()
+                if timestamp is None:
+                    break
+                yield timestamp, image
+            else:
+                yield image
+        finished = True
+    finally:
+        if not finished:
+            process.kill()
+        process.stdout.close()
+        process.wait()
+        stderr_thread.join()
+
+    if process.returncode != 0:
+        raise ffmpeg.Error('ffmpeg', None, b''.join(stderr_chunks))
+
+
+def _input(video_path, threads=None, **kwargs):
+    """Returns ffmpeg.input(), limiting decoder threads when `threads` is set."""
+    if threads:
+        kwargs['threads'] = threads
+    return ffmpeg.input(video_path, **kwargs)
+
+
+def _seek_kwargs(interval_seconds, start_index):
+    """Input-seek options that start sampling at sample `start_index`."""
+    return {'ss': start_index * interval_seconds} if start_index else {}
+
+
+def _stop_kwargs(interval_seconds, start_index, stop_index):
+    """Output options that end sampling before sample `stop_index` (None: at the end of the video)."""
+    return {'t': (stop_index - start_index) * interval_seconds} if stop_index is not None else {}
+
+
+def _numbered(images, interval_seconds, start_index, stop_index):
+    """Yields the read_raw_frames `images` as Frames numbered from `start_index`, up to `stop_index`."""
+    try:
+        for index, image in enumerate(images, start_index):
+            if stop_index is not None and index >= stop_index:
+                return
+            yield Frame(index, index * interval_seconds, image, None)
+    finally:
+        images.close() # Stops FFmpeg if it is still running
+
+
+def stream_frames(video_path, interval_seconds, threads=None, start_index=0, stop_index=None):
+    """
+    Yields a Frame every `interval_seconds` of the video, decoded straight
+    from an FFmpeg pipe. Same sampling rate as extract_frames, without the PNGs.
+
+    round=up makes sample k the first frame at or after k * interval_seconds,
+    which is exactly the frame fetch_frame/fetch_roi return for that timestamp.
+    `threads` caps FFmpeg's decoder threads (None lets FFmpeg decide).
+    `start_index` resumes sampling at that sample, seeking straight to it, and
+    `stop_index` (exclusive) ends it early, e.g. for one segment of a video.
+    """
+    width, height, _ = probe_video(video_path)
+    stream = (
+        _input(video_path, threads, **_seek_kwargs(interval_seconds, start_index))
+        .filter('fps', fps=f'1/{interval_seconds}', round='up')
+        .output('pipe:', format='rawvideo', pix_fmt='rgb24',
+                **_stop_kwargs(interval_seconds, start_index, stop_index))
+    )
+    yield from _numbered(read_raw_frames(stream, (height, width, 3)), interval_seconds, start_index, stop_index)
+
+
+def stream_rois(video_path, interval_seconds, crop_box, threads=None, start_index=0, stop_index=None):
+    """
+    Like stream_frames, but FFmpeg converts each sampled frame to grayscale and
+    crops it to `crop_box` (left, upper, right, lower) inside its filter graph,
+    so only the small page-number strip crosses the pipe. Each Frame's `image`
+    is a (height, width) uint8 array of that region.
+    """
+    left, upper, right, lower = crop_box
+    stream = (
+        _input(video_path, threads, **_seek_kwargs(interval_seconds, start_index))
+        .filter('fps', fps=f'1/{interval_seconds}', round='up')
+        .filter('format', 'gray')
+        .crop(left, upper, right - left, lower - upper)
+        .output('pipe:', format='rawvideo', pix_fmt='gray',
+                **_stop_kwargs(interval_seconds, start_index, stop_index))
+    )
+    yield from _numbered(read_raw_frames(stream, (lower - upper, right - left)), interval_seconds, start_index,
+                         stop_index)
+
+
+def _sample_output(stream, frame_size, crop_box=None, **output_kwargs):
+    """
+    Finishes a sampling filter chain: full RGB frames of `frame_size`
+    (width, height), or the grayscale `crop_box` region when one is given.
+    Returns (output stream, frame shape).
+    """
+    if crop_box is None:
+        width, height = frame_size
+        return stream.output('pipe:', format='rawvideo', pix_fmt='rgb24', **output_kwargs), (height, width, 3)
+    left, upper, right, lower = crop_box
+    stream = stream.filter('format', 'gray').crop(left, upper, right - left, lower - upper)
+    return stream.output('pipe:', format='rawvideo', pix_fmt='gray', **output_kwargs), (lower - upper, right - left)
+
+
+def _timed_samples(stream, frame_size, crop_box):
+    """Yields (presentation_time, image) for every frame a select-style filter chain lets through."""
+    output, shape = _sample_output(stream.filter('showinfo'), frame_size, crop_box, fps_mode='passthrough')
+    return read_raw_frames(output, shape, with_timestamps=True)
+
+
+def _interval_samples(video_path, start, end, interval_seconds, frame_size, crop_box, threads=None):
+    """Yields (timestamp, image) every `interval_seconds` from `start` (inclusive) to `end` (exclusive)."""
+    if start >= end:
+        return
+    stream = _input(video_path, threads, ss=start).filter('fps', fps=f'1/{interval_seconds}', round='up')
+    output, shape = _sample_output(stream, frame_size, crop_box, t=end - start)
+    for index, image in enumerate(read_raw_frames(output, shape)):
+        yield start + index * interval_seconds, image
+
+
+def stream_keyframes(video_path, crop_box=None, max_gap_seconds=None, interval_seconds=None, threads=None):
+    """
+    Yields a Frame for every keyframe of the video. FFmpeg skips decoding all
+    other frames (-skip_frame nokey), which on mostly static screen recordings
+    is a small fraction of the work of decoding every frame. Each Frame's
+    `timestamp` is the keyframe's presentation time and `index` counts samples.
+
+    Slide changes usually start a new GOP, but encoders with long GOPs can sit
+    on one keyframe across several slides. Where two keyframes are more than
+    `max_gap_seconds` apart, the gap is sampled every `interval_seconds` as in
+    stream_frames instead. A page that starts and ends inside a shorter gap is
+    never sampled, so pages shown for less than a GOP can be missed. The end of
+    the video after the last keyframe is always sampled every
+    `interval_seconds`, since no later keyframe would show a page starting there.
+    `crop_box` gives grayscale page-number regions as in stream_rois.
+    """
+    width, height, duration = probe_video(video_path)
+    keyframes = _timed_samples(_input(video_path, threads, skip_frame='nokey'), (width, height), crop_box)
+
+    def gap_samples(start, end):
+        if max_gap_seconds is None or end - start <= max_gap_seconds:
+            return ()
+        return _interval_samples(video_path, start + interval_seconds, end, interval_seconds,
+                                 (width, height), crop_box, threads)
+
+    index = 0
+    previous_timestamp = None
+    for timestamp, image in keyframes:
+        if previous_timestamp is not None:
+            for gap_timestamp, gap_image in gap_samples(previous_timestamp, timestamp):
+                yield Frame(index, gap_timestamp, gap_image, None)
+                index += 1
+        yield Frame(index, timestamp, image, None)
+        index += 1
+        previous_timestamp = timestamp
+    if previous_timestamp is not None and interval_seconds is not None:
+        for tail_timestamp, tail_image in _interval_samples(video_path, previous_timestamp + interval_seconds, duration,
+                                                            interval_seconds, (width, height), crop_box, threads):
+            yield Frame(index, tail_timestamp, tail_image, None)
+            index += 1
+
+
+def stream_scene_changes(video_path, threshold, max_gap_seconds=None, crop_box=None, threads=None):
+    """
+    Yields a Frame for the first frame of the video and for every frame whose
+    FFmpeg scene score (0.0-1.0, how much it differs from the frame before)
+    is above `threshold`. Every frame is decoded to score it, but only the
+    selected ones are converted and piped out. A frame is also taken once
+    `max_gap_seconds` pass without one, so a slide change too small to score
+    (e.g. only the page number changes) is still picked up.
+    Each Frame's `timestamp` is its presentation time and `index` counts samples.
+    `crop_box` gives grayscale page-number regions as in stream_rois.
+    """
+    width, height, _ = probe_video(video_path)
+    expression = f'isnan(prev_selected_t)+gt(scene,{threshold})'
+    if max_gap_seconds is not None:
+        expression += f'+gte(t-prev_selected_t,{max_gap_seconds})'
+    stream = _input(video_path, threads).filter('select', expression)
+    for index, (timestamp, image) in enumerate(_timed_samples(stream, (width, height), crop_box)):
+        yield Frame(index, timestamp, image, None)
+
+
+def fetch_roi(video_path, timestamp, crop_box, threads=None):
+    """
+    Decodes only the grayscale `crop_box` region of the frame at `timestamp`
+    seconds, using an input seek. Returns None if the video has no frame there.
+    """
+    left, upper, right, lower = crop_box
+    stream = (
+        _input(video_path, threads, ss=timestamp)
+        .filter('format', 'gray')
+        .crop(left, upper, right - left, lower - upper)
+        .output('pipe:', vframes=1, format='rawvideo', pix_fmt='gray')
+    )
+    for image in read_raw_frames(stream, (lower - upper, right - left)):
+        return image
+    return None
+
+
+def fetch_frame(video_path, timestamp, frame_size=None, threads=None):
+    """
+    Decodes the single full-resolution RGB frame at `timestamp` seconds, using
+    an input seek so FFmpeg jumps to the nearest keyframe instead of decoding
+    from the start. `frame_size` is (width, height); probed if not given.
+    """
+    width, height = frame_size or probe_video(video_path)[:2]
+    stream = (
+        _input(video_path, threads, ss=timestamp)
+        .output('pipe:', vframes=1, format='rawvideo', pix_fmt='rgb24')
+    )
+    for image in read_raw_frames(stream, (height, width, 3)):
+        return image
+    raise ffmpeg.Error('ffmpeg', None, f"No frame at {timestamp}s in {video_path}".encode('utf8'))
+
+
+def frames_from_folder(folder, interval_seconds):
+    """
+    Yields a Frame for every PNG/JPG extract_frames wrote to `folder`, in
+    file-name order. Images are loaded lazily, one at a time.
+    """
+    frame_files = sorted(f for f in os.listdir(folder) if f.lower().endswith(('.png', '.jpg')))
+    for index, frame_file in enumerate(frame_files):
+        path = os.path.join(folder, frame_file)
+        with Image.open(path) as img:
+            image = np.asarray(img.convert('RGB'))
+        yield Frame(index, index * interval_seconds, image, path)
+
+
+def save_frame(frame, destination_path, **save_options):
+    """
+    Encodes `frame` to `destination_path` with PIL's save() `save_options` (format,
+    quality, ...). A frame extract_frames already wrote as a PNG is moved there
+    instead when a PNG is wanted, since nothing reads the temp file again.
+    """
+    if frame.path is not None and frame.path.lower().endswith('.png') and save_options.get('format', 'PNG') == 'PNG':
+        shutil.move(frame.path, destination_path)
+    else:
+        Image.fromarray(frame.image).save(destination_path, **save_options)
@@ -0,0 +1,222 @@
+"""
+Per-stage timers and counters for process_video_for_unique_slides.
+
+A Recorder sums monotonic (perf_counter) time per stage (probe, extract,
+decode, crop, ocr, fetch_frame, write_slide, ...) and keeps counters (frames
+decoded, OCR calls and failures, bytes written, ...). It is shared with the OCR
+worker threads, so updates are locked. When instrumentation is off the scripts
+get NULL_RECORDER, whose methods do nothing and hand back the wrapped function
+or iterable unchanged, so the hot loop pays one no-op call per hook at most.
+
+write_report() turns the per-video results of a batch into a JSON and a CSV
+file, print_report() into a short table; profiled() captures a cProfile dump.
+"""
+import contextlib
+import cProfile
+import csv
+import json
+import threading
+import time
+
+# Stages shown in print_report, in pipeline order
+SUMMARY_STAGES = ("probe", "extract", "decode", "crop", "ocr", "fetch_frame", "write_slide")
+
+
+class _Stage:
+    """Context manager that adds its elapsed time to one stage of a Recorder."""
+
+    __slots__ = ("recorder", "name", "start")
+
+    def __init__(self, recorder, name):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.recorder.add_time(self.name, time.perf_counter() - self.start)
+
+
+class Recorder:
+    """Stage timings and counters of one video."""
+
+    enabled = True
+
+    def __init__(self):
+        self.stage_seconds = {}
+        self.stage_calls = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def add_time(self, name, seconds):
+        with self._lock:
+            self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            self.stage_calls[name] = self.stage_calls.get(name, 0) + 1
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def stage(self, name):
+        """Returns a context manager that times its block as stage `name`."""
+        return _Stage(self, name)
+
+    def timed(self, name, function, none_counter=None):
+        """
+        Returns `function` wrapped to time every call as stage `name`. With
+        `none_counter`, calls returning None are also counted under that name.
+        """
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            self.add_time(name, time.perf_counter() - start)
+            if none_counter is not None and result is None:
+                self.count(none_counter)
+            return result
+        return wrapper
+
+    def iterate(self, name, iterable, counter=None):
+        """
+        Yields from `iterable`, timing each step as stage `name` (e.g. the
+        FFmpeg pipe read behind a frame generator) and counting items under
+        `counter`.
+        """
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - start)
+                return
+            self.add_time(name, time.perf_counter() - start)
+            if counter is not None:
+                self.count(counter)
+            yield item
+
+    def merge(self, data):
+        """Adds the stage times, calls and counters of another Recorder's as_dict(), e.g. from a worker process."""
+        if not data:
+            return
+        with self._lock:
+            for name, seconds in data["stage_seconds"].items():
+                self.stage_seconds[name] = self.stage_seconds.get(name, 0.0) + seconds
+            for name, calls in data["stage_calls"].items():
+                self.stage_calls[name] = self.stage_calls.get(name, 0) + calls
+            for name, amount in data["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "stage_seconds": dict(self.stage_seconds),
+                "stage_calls": dict(self.stage_calls),
+                "counters": dict(self.counters),
+            }
+
+
+class _NullRecorder:
+    """Recorder stand-in used when instrumentation is off."""
+
+    enabled = False
+    _null_stage = contextlib.nullcontext()
+
+    def add_time(self, name, seconds):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+    def stage(self, name):
+        return self._null_stage
+
+    def timed(self, name, function, none_counter=None):
+        return function
+
+    def iterate(self, name, iterable, counter=None):
+        return iterable
+
+    def merge(self, data):
+        pass
+
+    def as_dict(self):
+        return None
+
+
+NULL_RECORDER = _NullRecorder()
+
+
+def create_recorder(enabled):
+    """Returns a new Recorder, or NULL_RECORDER when `enabled` is false."""
+    return Recorder() if enabled else NULL_RECORDER
+
+
+@contextlib.contextmanager
+def profiled(path):
+    """
+    Runs the block under cProfile and dumps the stats to `path` (open with pstats
+    or snakeviz). Only the calling thread is profiled, not the OCR workers. If
+    another profiler is already active (Python 3.12+ allows one at a time, e.g.
+    with several videos running at once) the block runs unprofiled.
+    """
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        print(f"Not profiling for {path}: another profiler is already running.")
+        yield
+        return
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def write_report(results, path_prefix):
+    """
+    Writes the per-video results of batch_scheduler.run_batch, with their
+    "instrumentation" dicts, to `path_prefix`.json (everything) and
+    `path_prefix`.csv (one row per video, a column per stage and counter).
+    Returns the two paths.
+    """
+    json_path, csv_path = path_prefix + ".json", path_prefix + ".csv"
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    stages, counters = [], []
+    for r in results:
+        data = r.get("instrumentation") or {}
+        stages.extend(s for s in data.get("stage_seconds", {}) if s not in stages)
+        counters.extend(c for c in data.get("counters", {}) if c not in counters)
+    fields = ["video", "status", "duration", "wall_seconds", "frames", "slides"]
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields + [f"{s}_seconds" for s in stages] + [f"{s}_calls" for s in stages] + counters)
+        for r in results:
+            data = r.get("instrumentation") or {}
+            writer.writerow([r.get(field) for field in fields]
+                            + [data.get("stage_seconds", {}).get(s) for s in stages]
+                            + [data.get("stage_calls", {}).get(s) for s in stages]
+                            + [data.get("counters", {}).get(c) for c in counters])
+    return json_path, csv_path
+
+
+def print_report(results):
+    """Prints seconds per stage and the main counters for every instrumented video."""
+    header = (f"{'Video':<32} " + " ".join(f"{stage[:11]:>11}" for stage in SUMMARY_STAGES)
+              + f" {'Frames':>7} {'OCR':>6} {'Fail':>5} {'MB out':>7}")
+    print("\n" + header)
+    print("-" * len(header))
+    for r in results:
+        data = r.get("instrumentation")
+        if not data:
+            continue
+        seconds, counters = data["stage_seconds"], data["counters"]
+        stage_cells = " ".join(f"{seconds[stage]:11.2f}" if stage in seconds else "-".rjust(11)
+                               for stage in SUMMARY_STAGES)
+        print(f"{r['video'][:32]:<32} {stage_cells} {counters.get('frames_decoded', 0):7d} "
+              f"{data['stage_calls'].get('ocr', 0):6d} {counters.get('ocr_failures', 0):5d} "
+              f"{counters.get('bytes_written', 0) / 1e6:7.1f}")
+    print("Stage times are summed over OCR workers, so they can add up to more than the wall time.")
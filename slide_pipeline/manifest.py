@@ -0,0 +1,144 @@
+"""
+Per-video manifests for incremental, resumable runs.
+
+A manifest is a small JSON file per video and selection strategy. It records
+the video's size and mtime, a hash of the settings that affect the result
+(ROI, interval, strategy, ...), the slides saved so far and the last sample
+processed. With it a run can:
+
+  * skip videos that are unchanged since they were last completed,
+  * resume an interrupted video from its last checkpoint instead of frame 0,
+  * clean up the slides of a previous run whose video or settings changed.
+"""
+import hashlib
+import json
+import os
+import time
+
+MANIFEST_VERSION = 1
+
+
+def manifest_path(folder, video_file, strategy):
+    """Returns the manifest file for a video processed with `strategy` ("first" or "last")."""
+    return os.path.join(folder, f"{os.path.basename(video_file)}.{strategy}.json")
+
+
+def video_signature(video_path):
+    """Returns the size and modification time that identify a version of a video file."""
+    stat = os.stat(video_path)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def settings_hash(settings):
+    """Returns a short stable hash of a dict of JSON-serialisable settings."""
+    encoded = json.dumps(settings, sort_keys=True).encode('utf8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def new_manifest(video_path, settings):
+    """Returns a fresh, in-progress manifest for a video."""
+    return {
+        "version": MANIFEST_VERSION,
+        "video": os.path.basename(video_path),
+        **video_signature(video_path),
+        "settings": settings,
+        "settings_hash": settings_hash(settings),
+        "status": "in_progress",
+        "next_index": 0,
+        "last_processed_timestamp": None,
+        "frames": 0,
+        "pages": [],
+        "state": {},
+    }
+
+
+def load_manifest(path):
+    """Returns the manifest stored at `path`, or None if there is none (or it is unreadable)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_manifest(path, manifest):
+    """Writes a manifest atomically, so a crash mid-write never leaves a broken file."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def check_manifest(manifest, video_path, settings):
+    """
+    Compares a loaded manifest with the video on disk and the current settings.
+    Returns "new" (no manifest), "complete" (unchanged and finished),
+    "resume" (unchanged but interrupted) or "stale" (video or settings changed).
+    """
+    if manifest is None:
+        return "new"
+    if (manifest.get("version") != MANIFEST_VERSION
+            or {k: manifest.get(k) for k in ("size", "mtime")} != video_signature(video_path)
+            or manifest.get("settings_hash") != settings_hash(settings)):
+        return "stale"
+    return "complete" if manifest.get("status") == "complete" else "resume"
+
+
+def remove_outputs(manifest):
+    """Deletes the slide files a (stale) manifest says were written."""
+    for page in manifest.get("pages", []):
+        if page.get("file") and os.path.exists(page["file"]):
+            os.remove(page["file"])
+
+
+def open_manifest(path, video_path, settings, can_resume=True):
+    """
+    Decides what to do with a video given its manifest at `path`.
+    Returns (action, manifest), where action is:
+      "skip"   - the video and settings are unchanged and it was finished before,
+      "resume" - an interrupted run can carry on from manifest["next_index"],
+      "start"  - process from the first frame with a fresh manifest.
+    The slides of a stale run (or of an interrupted one that cannot be resumed,
+    e.g. because its frames came from a one-shot extraction) are deleted first.
+    """
+    manifest = load_manifest(path)
+    state = check_manifest(manifest, video_path, settings)
+    if state == "complete":
+        return "skip", manifest
+    if state == "resume" and can_resume:
+        return "resume", manifest
+    if manifest is not None:
+        remove_outputs(manifest)
+    return "start", new_manifest(video_path, settings)
+
+
+class Checkpointer:
+    """Saves a manifest's progress at most once every `interval_seconds`."""
+
+    def __init__(self, path, manifest, interval_seconds):
+        self.path = path
+        self.manifest = manifest
+        self.interval_seconds = interval_seconds
+        self._last_save = time.monotonic()
+
+    def due(self):
+        """Returns True once `interval_seconds` have passed since the last save."""
+        return time.monotonic() - self._last_save >= self.interval_seconds
+
+    def save(self, next_index, interval_seconds, frames, pages, state, status="in_progress"):
+        """
+        Records that every sample before `next_index` is done: `frames` samples
+        read so far, `pages` the slides on disk ([{"page", "index", "timestamp",
+        "file"}]) and `state` whatever the selector needs to carry on.
+        """
+        self.manifest.update({
+            "status": status,
+            "next_index": next_index,
+            "last_processed_timestamp": (next_index - 1) * interval_seconds if next_index else None,
+            "frames": frames,
+            "pages": pages,
+            "state": state,
+        })
+        save_manifest(self.path, self.manifest)
+        self._last_save = time.monotonic()
@@ -0,0 +1,209 @@
+"""
+OCR backends behind get_page_number_from_roi.
+
+pytesseract starts a new `tesseract` process for every call: it writes a temp
+image, reloads the language data and parses a temp output file. On a small
+page-number crop that start-up costs far more than the recognition itself.
+The backends here keep the same image_to_string(image, config) call but pay
+that cost less often:
+
+  "pytesseract" - one tesseract process per crop (the original behaviour).
+  "tesserocr"   - a long-lived Tesseract engine per worker thread, through the
+                  optional `tesserocr` package (pip install tesserocr).
+  "tiled"       - crops requested at the same time by different workers are
+                  stacked into one tall image and read with a single tesseract
+                  call; the recognised words are mapped back to their crops by
+                  position.
+"""
+import bisect
+import shlex
+import threading
+
+import pytesseract
+from PIL import Image
+
+from slide_pipeline import frame_stream
+
+
+class PytesseractBackend:
+    """One tesseract process per call."""
+
+    name = "pytesseract"
+
+    def image_to_string(self, image, config=''):
+        return pytesseract.image_to_string(frame_stream.to_pil_image(image), config=config)
+
+    def images_to_strings(self, images, config=''):
+        return [self.image_to_string(image, config) for image in images]
+
+
+class TesserocrBackend:
+    """Keeps one Tesseract engine alive per worker thread and per config string."""
+
+    name = "tesserocr"
+
+    def __init__(self, lang='eng', tessdata_path=None):
+        try:
+            import tesserocr
+        except ImportError:
+            raise ImportError("The 'tesserocr' OCR backend needs the tesserocr package: pip install tesserocr")
+        self._tesserocr = tesserocr
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self._local = threading.local()
+
+    def _engine(self, config):
+        engines = self._local.__dict__.setdefault('engines', {})
+        if config not in engines:
+            if self.tessdata_path:
+                api = self._tesserocr.PyTessBaseAPI(path=self.tessdata_path, lang=self.lang)
+            else:
+                api = self._tesserocr.PyTessBaseAPI(lang=self.lang)
+            apply_config(api, config)
+            engines[config] = api
+        return engines[config]
+
+    def image_to_string(self, image, config=''):
+        api = self._engine(config)
+        api.SetImage(frame_stream.to_pil_image(image))
+        return api.GetUTF8Text()
+
+    def images_to_strings(self, images, config=''):
+        return [self.image_to_string(image, config) for image in images]
+
+
+def apply_config(api, config):
+    """Applies the '--psm N' and '-c name=value' parts of a tesseract config string to a tesserocr engine."""
+    args = shlex.split(config)
+    i = 0
+    while i < len(args):
+        if args[i] == '--psm' and i + 1 < len(args):
+            api.SetPageSegMode(int(args[i + 1]))
+            i += 2
+        elif args[i] == '-c' and i + 1 < len(args):
+            name, value = args[i + 1].split('=', 1)
+            api.SetVariable(name, value)
+            i += 2
+        else:
+            i += 1
+
+
+class _Batch:
+    def __init__(self):
+        self.images = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class TiledBackend:
+    """
+    Packs crops into one tall image per tesseract call.
+
+    images_to_strings() does this for an explicit list of crops. image_to_string()
+    lets concurrent callers share a call: the first caller of a batch waits until
+    `batch_size` crops have arrived (or `max_wait` seconds have passed), reads
+    them all at once, and hands each caller its own text. A caller that finds no
+    other call in progress, such as a serial loop or the calibration, has nobody
+    to wait for and is read straight away.
+    """
+
+    name = "tiled"
+
+    def __init__(self, batch_size=8, max_wait=0.05, gap=24):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait
+        self.gap = gap
+        self._lock = threading.Lock()
+        self._open_batches = {}
+        self._calls = 0 # Callers inside image_to_string()
+
+    def images_to_strings(self, images, config=''):
+        tiles = [frame_stream.to_pil_image(image).convert('L') for image in images]
+        if not tiles:
+            return []
+        width = max(tile.width for tile in tiles) + 2 * self.gap
+        height = sum(tile.height for tile in tiles) + (len(tiles) + 1) * self.gap
+        canvas = Image.new('L', (width, height), 255)
+        tile_tops = []
+        top = self.gap
+        for tile in tiles:
+            canvas.paste(tile, (self.gap, top))
+            tile_tops.append(top)
+            top += tile.height + self.gap
+
+        data = pytesseract.image_to_data(canvas, config=config, output_type=pytesseract.Output.DICT)
+        words = [[] for _ in tiles]
+        for text, left, word_top, word_height in zip(data['text'], data['left'], data['top'], data['height']):
+            if not text.strip():
+                continue
+            center = word_top + word_height / 2
+            index = bisect.bisect_right(tile_tops, center) - 1
+            if 0 <= index < len(tiles) and center <= tile_tops[index] + tiles[index].height:
+                words[index].append((left, text))
+        return [' '.join(text for _, text in sorted(tile_words)) for tile_words in words]
+
+    def image_to_string(self, image, config=''):
+        if self.batch_size == 1:
+            return self.images_to_strings([image], config)[0]
+
+        with self._lock:
+            self._calls += 1
+            batch = self._open_batches.setdefault(config, _Batch())
+            slot = len(batch.images)
+            batch.images.append(image)
+            if len(batch.images) >= self.batch_size or self._calls == 1:
+                del self._open_batches[config]
+                batch.full.set()
+        try:
+            return self._read_in_batch(batch, slot, config)
+        finally:
+            with self._lock:
+                self._calls -= 1
+
+    def _read_in_batch(self, batch, slot, config):
+        if slot == 0:
+            batch.full.wait(self.max_wait)
+            with self._lock:
+                if self._open_batches.get(config) is batch:
+                    del self._open_batches[config]
+            try:
+                batch.results = self.images_to_strings(batch.images, config)
+            except Exception as e:
+                batch.error = e
+            batch.done.set()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[slot]
+
+
+BACKENDS = {
+    PytesseractBackend.name: PytesseractBackend,
+    TesserocrBackend.name: TesserocrBackend,
+    TiledBackend.name: TiledBackend,
+}
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def create_backend(name, batch_size=1):
+    """Returns a new backend by name; `batch_size` only matters for "tiled"."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown OCR backend '{name}'. Choose one of: {', '.join(BACKENDS)}")
+    if name == TiledBackend.name:
+        return TiledBackend(batch_size=batch_size)
+    return BACKENDS[name]()
+
+
+def get_backend(name, batch_size=1):
+    """Returns the shared backend for `name`, creating it on first use (thread-safe)."""
+    with _backends_lock:
+        key = (name, batch_size)
+        if key not in _backends:
+            _backends[key] = create_backend(name, batch_size)
+        return _backends[key]
@@ -0,0 +1,179 @@
+"""
+On-disk cache of OCR results, shared by every worker and every run.
+
+Re-running the pipeline after changing FRAME_INTERVAL_SECONDS or switching
+between 3.py and 4.py OCRs the same crops again. Results are stored in SQLite
+keyed by a hash of the exact image bytes handed to Tesseract, the config
+string and the OCR backend (backends can read the same crop differently), so
+a crop is only ever OCR'd once per backend. The least recently used entries
+are evicted once the cache grows past its size cap.
+
+Worker processes (segments, an OCR process pool) open the cache file on their
+own and count their hits and misses there; they hand them back with
+take_counts() and the parent adds them up with add_counts().
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from slide_pipeline import frame_stream
+
+# How many inserts between checks of the size cap
+_EVICTION_CHECK_INTERVAL = 256
+
+
+def cache_key(image, config, backend_name):
+    """Returns the hex key of an image (PIL or NumPy) plus tesseract config string and OCR backend name."""
+    pixels = np.ascontiguousarray(np.asarray(frame_stream.to_pil_image(image)))
+    digest = hashlib.sha256()
+    digest.update(backend_name.encode('utf8'))
+    digest.update(b'\0')
+    digest.update(config.encode('utf8'))
+    digest.update(f"{pixels.shape}{pixels.dtype}".encode('utf8'))
+    digest.update(pixels.tobytes())
+    return digest.hexdigest()
+
+
+class OcrCache:
+    """
+    SQLite store of OCR text with LRU eviction above `max_entries` rows.
+
+    Safe to share between threads (one connection per thread) and between
+    processes (SQLite WAL mode with a busy timeout).
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._inserts = 0
+        self._stats_lock = threading.Lock()
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connection() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS ocr_results "
+                "(key TEXT PRIMARY KEY, text TEXT NOT NULL, last_used REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ocr_results_last_used ON ocr_results (last_used)")
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        """Returns the cached text for `key`, or None, and marks the entry as recently used."""
+        with self._connection() as connection:
+            row = connection.execute("SELECT text FROM ocr_results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                connection.execute("UPDATE ocr_results SET last_used = ? WHERE key = ?", (time.time(), key))
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return None if row is None else row[0]
+
+    def put(self, key, text):
+        """Stores `text` under `key`, evicting the least recently used entries when over the cap."""
+        with self._connection() as connection:
+            connection.execute("INSERT OR REPLACE INTO ocr_results (key, text, last_used) VALUES (?, ?, ?)",
+                               (key, text, time.time()))
+        with self._stats_lock:
+            self._inserts += 1
+            check_size = self._inserts % _EVICTION_CHECK_INTERVAL == 0
+        if check_size:
+            self.evict()
+
+    def evict(self):
+        """Deletes the least recently used entries beyond `max_entries`."""
+        with self._connection() as connection:
+            count = connection.execute("SELECT COUNT(*) FROM ocr_results").fetchone()[0]
+            if count > self.max_entries:
+                connection.execute(
+                    "DELETE FROM ocr_results WHERE key IN "
+                    "(SELECT key FROM ocr_results ORDER BY last_used LIMIT ?)", (count - self.max_entries,))
+
+    def wrap(self, backend):
+        """Returns `backend` (from ocr_backends) with image_to_string answered from the cache when possible."""
+        return CachedBackend(backend, self)
+
+    def take_counts(self):
+        """Returns (hits, misses) since the last call and counts from zero again, e.g. to report a worker's share."""
+        with self._stats_lock:
+            counts = (self.hits, self.misses)
+            self.hits = self.misses = 0
+        return counts
+
+    def add_counts(self, hits, misses):
+        """Adds the hits and misses a worker process counted (see take_counts)."""
+        with self._stats_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def summary(self):
+        """Returns a one-line hit/miss report."""
+        lookups = self.hits + self.misses
+        hit_percent = 100.0 * self.hits / lookups if lookups else 0.0
+        return f"OCR cache: {self.hits} hits, {self.misses} misses ({hit_percent:.1f}% hit rate) in {self.path}"
+
+
+class CachedBackend:
+    """An OCR backend that checks an OcrCache before calling the wrapped backend."""
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+        self.name = f"cached {backend.name}"
+
+    def image_to_string(self, image, config=''):
+        key = cache_key(image, config, self.backend.name)
+        text = self.cache.get(key)
+        if text is None:
+            text = self.backend.image_to_string(image, config)
+            self.cache.put(key, text)
+        return text
+
+    def images_to_strings(self, images, config=''):
+        return [self.image_to_string(image, config) for image in images]
+
+
+def add_worker_counts(results, cache):
+    """
+    Takes the `(context, (value, counts))` pairs of parallel_ocr.ordered_map over a
+    worker function that returns its cache's take_counts() with its value, adds the
+    counts to `cache` and yields `(context, value)`. A result that ordered_map
+    repeats for a skipped item is counted once. None results pass through.
+    """
+    counted = None
+    for context, result in results:
+        if result is None:
+            yield context, None
+            continue
+        value, counts = result
+        if result is not counted:
+            cache.add_counts(*counts)
+            counted = result
+        yield context, value
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path, max_entries):
+    """Returns the shared OcrCache for `path`, opening it on first use (thread-safe)."""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = OcrCache(path, max_entries)
+        return _caches[path]
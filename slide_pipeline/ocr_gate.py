@@ -0,0 +1,88 @@
+"""
+Cheap change-detection gate in front of the page-number OCR.
+
+Consecutive sampled frames almost always show the same page number, so before
+calling Tesseract we compare the cropped page-number region against the last
+region that actually went through OCR. If hardly any pixels changed we reuse
+that OCR result instead of starting another Tesseract process.
+
+The change is counted in pixels, not as a share of the region: going from
+one page number to the next can move only a few dozen pixels of a region
+many times larger, and a share small enough to catch that is no safer.
+"""
+import numpy as np
+from PIL import Image
+
+
+def to_gray_array(roi):
+    """Returns a PIL image or NumPy array as a 2-D int16 grayscale array."""
+    if isinstance(roi, Image.Image):
+        return np.asarray(roi.convert('L'), dtype=np.int16)
+    roi = np.asarray(roi)
+    if roi.ndim == 3:
+        # Same ITU-R 601-2 luma weights PIL uses for convert('L')
+        roi = roi[..., 0] * 0.299 + roi[..., 1] * 0.587 + roi[..., 2] * 0.114
+    return roi.astype(np.int16)
+
+
+def changed_pixels(gray, previous_gray, pixel_delta):
+    """
+    Returns how many pixels differ by more than `pixel_delta` between two
+    grayscale arrays (all of them if their shapes differ).
+    """
+    if gray.shape != previous_gray.shape:
+        return max(gray.size, previous_gray.size)
+    return int(np.count_nonzero(np.abs(gray - previous_gray) > pixel_delta))
+
+
+class OcrGate:
+    """
+    Wraps a page-number reader so it is only called when the region changed.
+
+    `threshold` is how many pixels may change before the region counts as
+    different (0: any changed pixel sends it to OCR); `pixel_delta` is how far
+    a pixel's gray value must move to count as changed, which keeps compression
+    noise from triggering OCR. One gate holds the state of one video.
+    """
+
+    def __init__(self, threshold=0, pixel_delta=32):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.ocr_calls = 0
+        self.ocr_calls_saved = 0
+        self._last_gray = None
+        self._last_page_number = None
+
+    def should_skip(self, roi):
+        """
+        Returns True if `roi` matches the last region that went through OCR.
+        Otherwise `roi` becomes that reference region and counts as an OCR call,
+        so this must be asked in frame order, once per frame.
+        """
+        gray = to_gray_array(roi)
+        if (self._last_gray is not None
+                and changed_pixels(gray, self._last_gray, self.pixel_delta) <= self.threshold):
+            self.ocr_calls_saved += 1
+            return True
+        self.ocr_calls += 1
+        self._last_gray = gray
+        return False
+
+    def wrap(self, read_page_number):
+        """
+        Returns a function with the same (roi, frame_label) signature as
+        `read_page_number` that skips the call when the region is unchanged.
+        """
+        def gated_read_page_number(roi, frame_label=None):
+            if self.should_skip(roi):
+                return self._last_page_number
+            self._last_page_number = read_page_number(roi, frame_label)
+            return self._last_page_number
+        return gated_read_page_number
+
+    def summary(self):
+        """Returns a one-line report of how many OCR calls the gate saved."""
+        total = self.ocr_calls + self.ocr_calls_saved
+        saved_percent = 100.0 * self.ocr_calls_saved / total if total else 0.0
+        return (f"OCR gate: {self.ocr_calls} OCR calls for {total} frames, "
+                f"{self.ocr_calls_saved} skipped ({saved_percent:.1f}% saved)")
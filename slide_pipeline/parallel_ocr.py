@@ -0,0 +1,72 @@
+"""
+Runs page-number OCR on a pool of workers while keeping results in frame order.
+
+Each pytesseract call blocks on its own Tesseract process, so a thread pool
+is enough to keep several cores busy; a process pool is available for OCR
+backends that hold the GIL. Results are handed back strictly in input order,
+so the first-occurrence (3.py) and last-occurrence (4.py) selection sees
+exactly the sequence a serial run would.
+"""
+import collections
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+
+
+def _completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+def ordered_map(function, items, workers, executor="thread", max_pending=None, skip=None):
+    """
+    Calls `function(*args)` for every `(context, args)` pair in `items` and
+    yields `(context, result)` in the same order as `items`.
+
+    Up to `workers` calls run at once ("thread" or "process" pool; workers <= 1
+    runs serially). A process pool is spawned, so `function` has to be
+    importable by the workers, e.g. a module-level function of the script. At most `max_pending` items (default 2 * workers) are
+    pulled from `items` before the oldest result has been consumed, which is
+    the backpressure that stops decoded frames piling up in memory.
+
+    `args` may be None for items that need no call; their result is None.
+    `skip(context, args)`, if given, is asked (in order) before each call and
+    can return True to reuse the result of the most recent call instead.
+    """
+    if workers <= 1:
+        last_result = None
+        for context, args in items:
+            if args is None:
+                yield context, None
+            elif skip is not None and skip(context, args):
+                yield context, last_result
+            else:
+                last_result = function(*args)
+                yield context, last_result
+        return
+
+    max_pending = max_pending or 2 * workers
+    if executor == "process":
+        # Spawned, not forked: the caller has other threads running and SQLite connections open
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    else:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    pending = collections.deque()
+    last_future = _completed(None)
+    try:
+        for context, args in items:
+            if args is None:
+                future = _completed(None)
+            elif skip is not None and skip(context, args):
+                future = last_future
+            else:
+                future = last_future = pool.submit(function, *args)
+            pending.append((context, future))
+            if len(pending) >= max_pending:
+                context, future = pending.popleft()
+                yield context, future.result()
+        while pending:
+            context, future = pending.popleft()
+            yield context, future.result()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
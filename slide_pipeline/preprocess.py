@@ -0,0 +1,204 @@
+"""
+Vectorized cleanup of page-number crops before OCR.
+
+Does the PIL chain that get_page_number_from_roi in 4.py used to carry
+commented out: convert('L'), ImageEnhance.Contrast, point() to a '1'
+threshold and a LANCZOS resize. Here it runs on a stacked (N, H, W) batch of
+crops at once, using PIL's own integer arithmetic, so every step gives the
+same pixels as the PIL call it replaces:
+
+  * grayscale uses PIL's fixed-point ITU-R 601-2 weights,
+  * contrast blends with the rounded mean the way ImageEnhance does (float32,
+    truncated),
+  * the threshold maps to 0/255 (a '1' image reads back as 0/255 in mode 'L'),
+    either at a fixed level or at each crop's Otsu level,
+  * resizing uses PIL's fixed-point LANCZOS coefficients, horizontal pass
+    first, or nearest neighbour once thresholded, since PIL resizes '1'
+    images with NEAREST whatever filter is asked for.
+"""
+import math
+
+import numpy as np
+from PIL import Image
+
+# PIL's fixed-point precision for 8-bit resampling (Resample.c)
+_PRECISION_BITS = 32 - 8 - 2
+_LANCZOS_SUPPORT = 3.0
+
+
+def as_array(crop):
+    """Returns a crop (PIL image or NumPy array) as a NumPy array; PIL 'L'/'RGB' become (H, W)/(H, W, 3) uint8."""
+    if isinstance(crop, Image.Image):
+        return np.asarray(crop.convert('L') if crop.mode not in ('L', 'RGB') else crop)
+    return np.asarray(crop)
+
+
+def to_gray(batch):
+    """Returns an (N, H, W) uint8 batch as is, or an (N, H, W, 3) RGB one converted like PIL's convert('L')."""
+    batch = np.asarray(batch)
+    if batch.ndim == 3:
+        return batch.astype(np.uint8, copy=False)
+    rgb = batch[..., :3].astype(np.uint32)
+    return ((rgb[..., 0] * 19595 + rgb[..., 1] * 38470 + rgb[..., 2] * 7471 + 0x8000) >> 16).astype(np.uint8)
+
+
+def enhance_contrast(gray, factor):
+    """Same as ImageEnhance.Contrast(image).enhance(factor) on every crop of a grayscale batch."""
+    means = np.floor(gray.mean(axis=(1, 2)) + 0.5).astype(np.float32)[:, None, None]
+    blended = means + np.float32(factor) * (gray.astype(np.float32) - means)
+    return np.clip(blended, 0, 255).astype(np.uint8)
+
+
+def otsu_levels(gray):
+    """
+    Returns the Otsu threshold of every crop: the level that splits its
+    histogram into the two classes with the largest between-class variance.
+    """
+    count = gray.shape[0]
+    offsets = (np.arange(count, dtype=np.int64) * 256)[:, None]
+    histograms = np.bincount((gray.reshape(count, -1) + offsets).ravel(), minlength=count * 256)
+    histograms = histograms.reshape(count, 256).astype(np.float64)
+    weights = np.cumsum(histograms, axis=1) # Pixels at or below each level
+    sums = np.cumsum(histograms * np.arange(256), axis=1)
+    total, total_sum = weights[:, -1:], sums[:, -1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        between = (total_sum * weights - total * sums) ** 2 / (weights * (total - weights))
+    # Levels at or below the split go black, so the threshold is one above it
+    return np.argmax(np.nan_to_num(between, nan=-1.0), axis=1) + 1
+
+
+def threshold(gray, level):
+    """
+    Same as point(lambda x: 0 if x < level else 255, '1') on every crop, as 0/255
+    uint8. `level` is a gray level, or "otsu" for each crop's own otsu_levels().
+    """
+    if level == "otsu":
+        levels = otsu_levels(gray)[:, None, None]
+    else:
+        levels = level
+    return np.where(gray < levels, 0, 255).astype(np.uint8)
+
+
+def _lanczos(x):
+    x = np.asarray(x, dtype=np.float64)
+    # sinc(x) * sinc(x / 3) on [-3, 3); np.sinc is sin(pi x) / (pi x)
+    return np.where((x >= -_LANCZOS_SUPPORT) & (x < _LANCZOS_SUPPORT), np.sinc(x) * np.sinc(x / _LANCZOS_SUPPORT), 0.0)
+
+
+def _lanczos_coefficients(in_size, out_size):
+    """Returns the (out_size, in_size) int64 fixed-point LANCZOS weights PIL uses along one axis."""
+    scale = in_size / out_size
+    filterscale = max(scale, 1.0)
+    support = _LANCZOS_SUPPORT * filterscale
+    coefficients = np.zeros((out_size, in_size), dtype=np.int64)
+    for out_x in range(out_size):
+        center = (out_x + 0.5) * scale
+        first = max(int(center - support + 0.5), 0)
+        last = min(int(center + support + 0.5), in_size)
+        weights = _lanczos((np.arange(first, last) - center + 0.5) / filterscale)
+        total = weights.sum()
+        if total != 0.0:
+            weights = weights / total
+        # C's (int) truncates towards zero after the +-0.5 rounding
+        fixed = np.where(weights < 0, -0.5, 0.5) + weights * (1 << _PRECISION_BITS)
+        coefficients[out_x, first:last] = np.trunc(fixed).astype(np.int64)
+    return coefficients
+
+
+def _resample_axis(batch, coefficients, axis):
+    """Applies fixed-point weights along `axis` (1 rows, 2 columns) with PIL's rounding and clipping."""
+    values = np.moveaxis(batch, axis, -1).astype(np.int64) @ coefficients.T
+    values = (values + (1 << (_PRECISION_BITS - 1))) >> _PRECISION_BITS
+    return np.moveaxis(np.clip(values, 0, 255).astype(np.uint8), -1, axis)
+
+
+def resize_lanczos(gray, width, height):
+    """Same as resize((width, height), Image.LANCZOS) on every crop of a grayscale batch."""
+    _, in_height, in_width = gray.shape
+    if width != in_width:
+        gray = _resample_axis(gray, _lanczos_coefficients(in_width, width), 2)
+    if height != in_height:
+        gray = _resample_axis(gray, _lanczos_coefficients(in_height, height), 1)
+    return gray
+
+
+def _nearest_indices(in_size, out_size):
+    """Returns the source index PIL's NEAREST resize reads for every output position along one axis."""
+    # PIL steps a double from the first pixel centre instead of multiplying, so accumulate the same way
+    step = in_size / out_size
+    positions = np.add.accumulate(np.concatenate(([step * 0.5], np.full(out_size - 1, step))))
+    return np.minimum(positions.astype(np.int64), in_size - 1)
+
+
+def resize_nearest(batch, width, height):
+    """Same as resize((width, height), Image.NEAREST) on every crop of a batch."""
+    _, in_height, in_width = batch.shape
+    return batch[:, _nearest_indices(in_height, height)[:, None], _nearest_indices(in_width, width)]
+
+
+class Preprocessor:
+    """
+    The configured chain: grayscale, then contrast by `contrast` (None skips
+    it), then `threshold` (a gray level, "otsu" or None), then upscaling by
+    `scale`. Called with a list of crops (PIL images or NumPy arrays of one
+    size) it returns the processed (N, H, W) uint8 batch.
+    """
+
+    def __init__(self, contrast=None, threshold=None, scale=1):
+        self.contrast = contrast
+        self.threshold = threshold
+        self.scale = scale
+
+    def __call__(self, crops):
+        batch = to_gray(np.stack([as_array(crop) for crop in crops]))
+        if self.contrast is not None:
+            batch = enhance_contrast(batch, self.contrast)
+        if self.threshold is not None:
+            batch = threshold(batch, self.threshold)
+        if self.scale != 1:
+            width, height = math.floor(batch.shape[2] * self.scale), math.floor(batch.shape[1] * self.scale)
+            # PIL ignores the filter for '1' images and uses NEAREST; a thresholded batch is one
+            resize = resize_nearest if self.threshold is not None else resize_lanczos
+            batch = resize(batch, width, height)
+        return batch
+
+    def one(self, crop):
+        """Processes a single crop; returns an (H, W) uint8 array."""
+        return self([crop])[0]
+
+    def wrap(self, read_page_number):
+        """Returns `read_page_number(crop, *args)` preprocessing each crop first, for crops read one at a time."""
+        def read(crop, *args):
+            return read_page_number(self.one(crop), *args)
+        return read
+
+
+def map_batches(items, batch_size, process):
+    """
+    Takes the `(context, (crop, *rest))` items that parallel_ocr.ordered_map
+    consumes and yields them in the same order, with each crop replaced by
+    its row of `process(crops)`, called on up to `batch_size` crops of the
+    same size at a time. Items whose args are None pass through.
+    """
+    def flush(batch):
+        groups = {}
+        for position, (_, args) in enumerate(batch):
+            if args is not None:
+                crop = args[0]
+                shape = (crop.mode, crop.size) if isinstance(crop, Image.Image) else np.shape(crop)
+                groups.setdefault(shape, []).append(position)
+        for positions in groups.values():
+            processed = process([batch[position][1][0] for position in positions])
+            for position, crop in zip(positions, processed):
+                context, args = batch[position]
+                batch[position] = (context, (crop,) + tuple(args[1:]))
+        return batch
+
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield from flush(batch)
+            batch = []
+    if batch:
+        yield from flush(batch)
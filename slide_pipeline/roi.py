@@ -0,0 +1,24 @@
+"""
+Page-number region (ROI) geometry shared by the full-frame and ROI-only paths.
+"""
+
+
+def page_number_crop_box(img_width, img_height, region_width, region_height, offset_x, offset_y):
+    """
+    Returns the (left, upper, right, lower) box of the page-number region in a
+    frame of the given size. The region is `region_width` x `region_height`,
+    `offset_x` pixels from the right edge and `offset_y` from the bottom edge.
+    """
+    # Calculate crop box coordinates
+    left = img_width - region_width - offset_x
+    upper = img_height - region_height - offset_y
+    right = img_width - offset_x
+    lower = img_height - offset_y
+
+    # Ensure coordinates are within image bounds
+    left = max(0, left)
+    upper = max(0, upper)
+    right = min(img_width, right)
+    lower = min(img_height, lower)
+
+    return (left, upper, right, lower)
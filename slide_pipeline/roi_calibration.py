@@ -0,0 +1,186 @@
+"""
+Automatic calibration of the page-number region (ROI).
+
+The configured PAGE_NUMBER_REGION_* box is a guess. It is usually larger
+than the page number, and when it misses the number every frame reads as
+None after a full OCR pass. Calibration decodes a handful of frames spread
+over a video, only a grayscale search area in the bottom-right corner. The
+pixels that change between samples are grouped into boxes, and each box is
+padded by about a digit. Boxes are tried smallest first: the first one
+from which the reader gets a page number on at least as many samples as
+from the configured box is used.
+
+Results are cached by resolution in a small JSON file, so each layout is
+calibrated only once. get_cache(None) keeps them in memory for one run only.
+"""
+import collections
+import json
+import os
+import threading
+
+import numpy as np
+
+from slide_pipeline import frame_stream
+
+# Gray levels a pixel has to move between two samples to count as changing
+PIXEL_DELTA = 48
+# Changing boxes smaller than this (width, height in pixels) are noise, not digits
+MIN_BOX_SIZE = (4, 8)
+# At most this many changing boxes are checked with OCR
+MAX_CANDIDATES = 4
+
+Calibration = collections.namedtuple('Calibration', ['box', 'readable', 'default_readable', 'samples', 'candidates'])
+
+
+def search_box(img_width, img_height, width_fraction, height_fraction, default_box):
+    """
+    Returns the (left, upper, right, lower) area calibration looks at: the
+    bottom-right `width_fraction` x `height_fraction` of the frame, grown to
+    contain `default_box`.
+    """
+    left = min(int(img_width * (1 - width_fraction)), default_box[0])
+    upper = min(int(img_height * (1 - height_fraction)), default_box[1])
+    return (max(0, left), max(0, upper), img_width, img_height)
+
+
+def _runs(flags, gap):
+    """Returns [(start, end)] of the True runs in `flags`, joining runs less than `gap` apart."""
+    runs = []
+    for index in np.flatnonzero(flags):
+        if runs and index - runs[-1][1] < gap:
+            runs[-1][1] = index + 1
+        else:
+            runs.append([index, index + 1])
+    return [(int(start), int(end)) for start, end in runs]
+
+
+def changing_regions(samples, pixel_delta=PIXEL_DELTA):
+    """
+    Returns the boxes (left, upper, right, lower) of the pixels that change
+    between the grayscale `samples`, smallest first. Rows that change are
+    split into bands and the columns of each band into boxes; gaps of about
+    a twentieth of the area stay inside one box.
+    """
+    stack = np.stack(samples).astype(np.int16)
+    mask = (stack.max(axis=0) - stack.min(axis=0)) > pixel_delta
+    gap = max(2, min(mask.shape) // 20)
+    boxes = []
+    for upper, lower in _runs(mask.any(axis=1), gap):
+        for left, right in _runs(mask[upper:lower].any(axis=0), gap):
+            if right - left >= MIN_BOX_SIZE[0] and lower - upper >= MIN_BOX_SIZE[1]:
+                boxes.append((left, upper, right, lower))
+    return sorted(boxes, key=lambda box: (box[2] - box[0]) * (box[3] - box[1]))
+
+
+def pad_box(box, width, height):
+    """
+    Grows a box by its height on the left and right, room for a page number
+    with one more digit, and by a quarter of it above and below. The result
+    is clipped to `width` x `height`.
+    """
+    left, upper, right, lower = box
+    pad_x, pad_y = lower - upper, max(2, (lower - upper) // 4)
+    return (max(0, left - pad_x), max(0, upper - pad_y), min(width, right + pad_x), min(height, lower + pad_y))
+
+
+def count_readable(samples, box, read_page_number):
+    """Returns on how many samples `read_page_number` finds a number inside `box`."""
+    left, upper, right, lower = box
+    return sum(1 for image in samples if read_page_number(image[upper:lower, left:right]) is not None)
+
+
+def calibrate(video_path, duration, search, default_box, read_page_number, sample_count, threads=None):
+    """
+    Finds the page-number box of a video (see the module docstring).
+    `read_page_number(image)` returns the page number in a grayscale crop or
+    None. Returns a Calibration: the chosen box in frame coordinates
+    (`default_box` if no changing region reads as well), on how many of the
+    samples it and `default_box` read a number, how many samples were taken
+    and how many changing regions were found.
+    """
+    samples = []
+    for i in range(sample_count):
+        image = frame_stream.fetch_roi(video_path, duration * (i + 0.5) / sample_count, search, threads)
+        if image is not None:
+            samples.append(image)
+    if not samples:
+        return Calibration(default_box, 0, 0, 0, 0)
+
+    origin_x, origin_y = search[0], search[1]
+    relative_default = (default_box[0] - origin_x, default_box[1] - origin_y,
+                        default_box[2] - origin_x, default_box[3] - origin_y)
+    default_readable = count_readable(samples, relative_default, read_page_number)
+    height, width = samples[0].shape
+    candidates = changing_regions(samples)
+    for candidate in candidates[:MAX_CANDIDATES]:
+        left, upper, right, lower = pad_box(candidate, width, height)
+        readable = count_readable(samples, (left, upper, right, lower), read_page_number)
+        if readable and readable >= default_readable:
+            box = (left + origin_x, upper + origin_y, right + origin_x, lower + origin_y)
+            return Calibration(box, readable, default_readable, len(samples), len(candidates))
+    return Calibration(default_box, default_readable, default_readable, len(samples), len(candidates))
+
+
+class CalibrationCache:
+    """
+    Calibrated boxes by resolution, stored as JSON at `path` (in memory only
+    if `path` is None). An entry only counts for the search area and default
+    box it was calibrated with, so changing PAGE_NUMBER_REGION_* recalibrates.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._boxes = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                print(f"Ignoring unreadable ROI calibration cache {path}.")
+
+    def box(self, img_width, img_height):
+        """Returns the box looked up or stored this run for a resolution, or None."""
+        return self._boxes.get((img_width, img_height))
+
+    def lookup(self, img_width, img_height, search, default_box):
+        """Returns the cached box for a resolution if it was calibrated with the same areas, else None."""
+        with self._lock:
+            entry = self._entries.get(f"{img_width}x{img_height}")
+            if entry is None or entry["search_box"] != list(search) or entry["default_box"] != list(default_box):
+                return None
+            box = tuple(entry["box"])
+            self._boxes[(img_width, img_height)] = box
+            return box
+
+    def store(self, img_width, img_height, search, default_box, calibration):
+        """Records a calibration for a resolution and saves the cache file atomically."""
+        with self._lock:
+            self._boxes[(img_width, img_height)] = tuple(calibration.box)
+            self._entries[f"{img_width}x{img_height}"] = {
+                "box": list(calibration.box),
+                "search_box": list(search),
+                "default_box": list(default_box),
+                "readable_samples": calibration.readable,
+                "default_readable_samples": calibration.default_readable,
+                "samples": calibration.samples,
+            }
+            if self.path:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                temp_path = self.path + ".tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    json.dump(self._entries, f, indent=2)
+                os.replace(temp_path, self.path)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path):
+    """Returns the shared CalibrationCache for `path`, loading it on first use (thread-safe)."""
+    with _caches_lock:
+        if path not in _caches:
+            _caches[path] = CalibrationCache(path)
+        return _caches[path]
@@ -0,0 +1,87 @@
+"""
+Time-segment parallel processing of one long video.
+
+One FFmpeg decode and one selection loop per video leave most cores idle on a
+single long recording. Here the samples of the video are split into
+contiguous ranges, and each range is decoded (with an input seek to its first
+sample) and OCR'd in its own worker process.
+
+A worker does not select slides. It boils its samples down to page runs,
+(page_number, first_index, last_index) for every stretch of readable samples
+showing the same page, as transition_search.find_page_runs does. merge_runs()
+joins the runs of neighbouring segments, so a page shown across a boundary
+becomes one run again. Both selectors only ever keep the first (3.py) or the
+last (4.py) sample of a run, so feeding them one sample per merged run picks
+the same slides, by the same monotonic page-number rule, as a serial run.
+"""
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def split_samples(start_index, sample_count, segment_count, min_samples=1):
+    """
+    Splits samples start_index .. sample_count - 1 into at most `segment_count`
+    contiguous [start, stop) ranges of at least `min_samples` each (fewer
+    ranges if there are not enough samples). The last range's stop is None,
+    meaning "to the end of the video", so samples past an estimated count are
+    never lost.
+    """
+    total = sample_count - start_index
+    count = max(1, min(segment_count, total // max(1, min_samples)))
+    bounds = [start_index + total * i // count for i in range(count + 1)]
+    ranges = list(zip(bounds, bounds[1:]))
+    ranges[-1] = (ranges[-1][0], None)
+    return ranges
+
+
+def page_runs(page_numbers):
+    """
+    Returns (runs, samples, unreadable) for an iterable of (frame, page_number):
+    the page runs as [(page_number, first_index, last_index)], how many samples
+    there were and how many of them had no readable page number.
+    """
+    runs = []
+    samples = unreadable = 0
+    for frame, page_number in page_numbers:
+        samples += 1
+        if page_number is None:
+            unreadable += 1
+        elif runs and runs[-1][0] == page_number:
+            runs[-1][2] = frame.index
+        else:
+            runs.append([page_number, frame.index, frame.index])
+    return [tuple(run) for run in runs], samples, unreadable
+
+
+def merge_runs(segment_runs):
+    """
+    Joins the page runs of consecutive segments into the runs of the whole
+    video: a run that ends one segment and a run of the same page that starts
+    the next are one run. The unreadable samples in between do not split it,
+    just as they do not inside a segment.
+    """
+    merged = []
+    for runs in segment_runs:
+        for page_number, first_index, last_index in runs:
+            if merged and merged[-1][0] == page_number:
+                merged[-1][2] = last_index
+            else:
+                merged.append([page_number, first_index, last_index])
+    return [tuple(run) for run in merged]
+
+
+def run_segments(scan_segment, ranges, workers, *args):
+    """
+    Calls `scan_segment(start, stop, *args)` for every range, up to `workers`
+    at a time, each in a worker process of its own even with one worker, so it
+    may change its module's settings. `scan_segment` has to be a picklable
+    module-level function. Returns the results in range order.
+
+    The workers are spawned, not forked: the caller is usually a batch thread
+    with other threads running (another video, FFmpeg pipe readers, slide
+    writers) and open SQLite connections, none of which survive a fork.
+    """
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(ranges))),
+                             mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(scan_segment, start, stop, *args) for start, stop in ranges]
+        return [future.result() for future in futures]
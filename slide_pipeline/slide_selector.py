@@ -0,0 +1,136 @@
+"""
+Streaming choice of one slide per page from (frame, page_number) pairs.
+
+Frames arrive in forward order and the selector decides which of them become
+slides, holding the pixels of at most one frame at a time:
+
+  * FirstOccurrenceSelector keeps the first frame of every page (3.py). A
+    frame is emitted the moment its page number goes up.
+  * LastOccurrenceSelector keeps the last frame of every page (4.py): the
+    frame whose page number is smaller than every page number after it. The
+    newest frame is only a candidate; it is emitted once a larger page number
+    follows it and withdrawn if a smaller or equal one does. Scanning
+    backwards and keeping every frame smaller than the last one kept gives
+    the same slides, but needs the whole video's frames first.
+
+The selectors only decide. add() returns the slides to write and the ones to
+delete again, and the caller does the I/O and records where each slide went
+in its `file`, so a selector can be rebuilt from a manifest's pages to resume.
+"""
+from slide_pipeline import frame_stream
+
+
+class Slide:
+    """A selected frame, its page number and the file it was written to (None until then)."""
+
+    __slots__ = ("page", "frame", "file")
+
+    def __init__(self, page, frame, file=None):
+        self.page = page
+        self.frame = frame
+        self.file = file
+
+    def as_dict(self):
+        """Returns the slide as a manifest page: {"page", "index", "timestamp", "file"}."""
+        return {"page": self.page, "index": self.frame.index, "timestamp": self.frame.timestamp, "file": self.file}
+
+
+class FirstOccurrenceSelector:
+    """
+    Emits the first frame of each page whose number is larger than every page
+    number read before it. Smaller numbers are taken for misreads (or a video
+    that loops back) and ignored. A page shown before the first readable frame
+    is only kept if that frame is the video's first sample.
+    """
+
+    policy = "first"
+
+    def __init__(self, pages=(), state=None):
+        state = state or {}
+        self.slides = [Slide(page["page"], _frame_from_page(page), page["file"]) for page in pages]
+        # -1 makes sure the first page is always picked
+        self.previous_page_number = state.get("previous_page_number", -1)
+        self.seen_readable_frame = state.get("seen_readable_frame", False)
+
+    def add(self, frame, page_number):
+        """
+        Takes the next frame and its page number (None if unreadable). Returns
+        (emitted, withdrawn): the slides to write now, and always () for withdrawn.
+        """
+        if page_number is None:
+            return (), ()
+        emitted = ()
+        if page_number > self.previous_page_number:
+            if frame.index == 0 or self.seen_readable_frame:
+                slide = Slide(page_number, frame)
+                self.slides.append(slide)
+                emitted = (slide,)
+            self.previous_page_number = page_number
+        self.seen_readable_frame = True
+        return emitted, ()
+
+    def flush(self):
+        """Returns the selected slides that still have to be written (never any here)."""
+        return ()
+
+    def state(self):
+        """Returns what add() needs besides the slides to carry on after a resume."""
+        return {"previous_page_number": self.previous_page_number, "seen_readable_frame": self.seen_readable_frame}
+
+
+class LastOccurrenceSelector:
+    """
+    Keeps the candidates still in the running, oldest first, in `slides`. A new
+    frame knocks out every candidate with an equal or larger page number (it is
+    no longer the last frame of its page, or was an OCR error) and then becomes
+    the newest candidate itself. Only that newest one is held in memory; the
+    caller writes the older ones as they are emitted.
+    """
+
+    policy = "last"
+
+    def __init__(self, pages=(), state=None):
+        self.slides = [Slide(page["page"], _frame_from_page(page), page["file"]) for page in pages]
+
+    def add(self, frame, page_number):
+        """
+        Takes the next frame and its page number (None if unreadable). Returns
+        (emitted, withdrawn): the previous candidate when it survives this frame,
+        to be written, and the candidates knocked out, whose files (if written)
+        have to be deleted.
+        """
+        if page_number is None:
+            return (), ()
+        withdrawn = []
+        while self.slides and self.slides[-1].page >= page_number:
+            withdrawn.append(self.slides.pop())
+        emitted = self.flush()
+        self.slides.append(Slide(page_number, frame))
+        return emitted, withdrawn
+
+    def flush(self):
+        """Returns the newest candidate if it has not been written yet, e.g. before a checkpoint or at the end."""
+        if self.slides and self.slides[-1].file is None:
+            return (self.slides[-1],)
+        return ()
+
+    def state(self):
+        return {}
+
+
+SELECTORS = {selector.policy: selector for selector in (FirstOccurrenceSelector, LastOccurrenceSelector)}
+
+
+def create_selector(policy, pages=(), state=None):
+    """
+    Returns a selector for `policy` ("first" or "last"), resuming from the
+    `pages` and `state` of a manifest if given.
+    """
+    try:
+        return SELECTORS[policy](pages, state)
+    except KeyError:
+        raise ValueError(f"Unknown slide selection policy {policy!r}; expected one of {sorted(SELECTORS)}") from None
+
+
+def _frame_from_page(page):
+    return frame_stream.Frame(page["index"], page["timestamp"], None, None)
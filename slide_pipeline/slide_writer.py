@@ -0,0 +1,160 @@
+"""
+Writing the selected slides: the image format, background writes and packing.
+
+Slides are encoded straight from the decoded frame in memory as PNG (lossless),
+JPEG or WebP. A SlideWriter runs the writes, including the fetch of the full
+frame when only the page-number strip was decoded, on a small thread pool, so
+they overlap with the OCR of later frames. PIL's encoders and FFmpeg release the
+GIL, so the threads run in parallel with the main loop.
+
+At the end of a video its slides can be packed into one zip archive (stored
+as they are, since the images are already compressed) or a multi-page PDF.
+A JSON index gives the page number, timestamp, sample index and file of each
+slide.
+"""
+import json
+import os
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+# format -> (PIL format name, file extension)
+FORMATS = {"png": ("PNG", ".png"), "jpeg": ("JPEG", ".jpg"), "webp": ("WEBP", ".webp")}
+ARCHIVES = (None, "zip", "pdf")
+
+
+def save_options(image_format, quality):
+    """
+    Returns the PIL save() keyword arguments for writing a slide in `image_format`
+    ("png", "jpeg" or "webp") at `quality` (1-100; PNG is always lossless).
+    """
+    if image_format not in FORMATS:
+        raise ValueError(f"Unknown slide format {image_format!r}; expected one of {sorted(FORMATS)}")
+    pil_format = FORMATS[image_format][0]
+    if image_format == "png":
+        return {"format": pil_format}
+    return {"format": pil_format, "quality": quality}
+
+
+def slide_file_name(base_name, image_format):
+    """Returns `base_name` with the extension of `image_format`."""
+    return base_name + FORMATS[image_format][1]
+
+
+class SlideWriter:
+    """
+    Runs slide writes on `workers` threads (0 writes them in the calling thread)
+    and tracks them by destination path until they are done.
+    """
+
+    def __init__(self, workers=2):
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+        self._lock = threading.Lock()
+        self._pending = {} # path -> Future
+
+    def submit(self, path, write, *args):
+        """Calls `write(*args)`, which writes `path`, in the background."""
+        if self._pool is None:
+            write(*args)
+            return
+        future = self._pool.submit(write, *args)
+        with self._lock:
+            self._pending[path] = future
+        future.add_done_callback(lambda _: self._forget(path, future))
+
+    def _forget(self, path, future):
+        with self._lock:
+            if self._pending.get(path) is future:
+                del self._pending[path]
+
+    def remove(self, path):
+        """Deletes `path` once its write (if still pending) is done. Returns whether a file was deleted."""
+        with self._lock:
+            future = self._pending.get(path)
+        if future is not None:
+            future.result()
+        if os.path.exists(path):
+            os.remove(path)
+            return True
+        return False
+
+    def wait(self):
+        """Waits for every pending write; re-raises the first one that failed."""
+        with self._lock:
+            futures = list(self._pending.values())
+        for future in futures:
+            future.result()
+
+    def close(self):
+        """Waits for the pending writes and stops the threads."""
+        try:
+            self.wait()
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+
+
+def pack_zip(archive_path, files):
+    """Moves `files` into a zip archive at `archive_path`, stored uncompressed under their base names."""
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_STORED) as archive:
+        for file in files:
+            archive.write(file, os.path.basename(file))
+    for file in files:
+        os.remove(file)
+
+
+def pack_pdf(pdf_path, files):
+    """
+    Moves `files` into a PDF at `pdf_path`, one page per image, in order. Each page is
+    appended to the file as it is read, so only one image is open (and decoded) at a time.
+    """
+    for position, file in enumerate(files):
+        with Image.open(file) as image:
+            page = image if image.mode in ("RGB", "L") else image.convert("RGB")
+            page.save(pdf_path, "PDF", append=position > 0)
+    for file in files:
+        os.remove(file)
+
+
+def pack(folder, video_name, files, archive):
+    """
+    Packs a video's slide `files` as `archive` ("zip" or "pdf") into
+    `folder`/`video_name`_slides.zip/.pdf. Returns the archive path, or None
+    if there was nothing to pack or `archive` is None.
+    """
+    if archive not in ARCHIVES:
+        raise ValueError(f"Unknown slide archive {archive!r}; expected one of {list(ARCHIVES)}")
+    if archive is None or not files:
+        return None
+    archive_path = os.path.join(folder, f"{video_name}_slides.{archive}")
+    temp_path = archive_path + ".tmp"
+    if archive == "zip":
+        pack_zip(temp_path, files)
+    else:
+        pack_pdf(temp_path, files)
+    os.replace(temp_path, archive_path)
+    return archive_path
+
+
+def write_index(folder, video_name, video_file, pages, archive_path=None):
+    """
+    Writes `folder`/`video_name`_slides.json: the video and, for every slide, its page
+    number, timestamp, sample index and file (the member name if packed into
+    `archive_path`, the PDF page number for a PDF). `pages` are manifest-style dicts
+    ({"page", "index", "timestamp", "file"}). Returns the index path.
+    """
+    slides = []
+    for position, page in enumerate(pages):
+        entry = {"page": page["page"], "timestamp": page["timestamp"], "index": page["index"],
+                 "file": os.path.basename(page["file"]) if page["file"] else None}
+        if archive_path is not None and archive_path.endswith(".pdf"):
+            entry["pdf_page"] = position + 1
+        slides.append(entry)
+    index_path = os.path.join(folder, f"{video_name}_slides.json")
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump({"video": video_file,
+                   "archive": os.path.basename(archive_path) if archive_path else None,
+                   "slides": slides}, f, indent=2)
+    return index_path
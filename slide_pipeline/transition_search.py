@@ -0,0 +1,66 @@
+"""
+Seek-based search for page transitions instead of OCR'ing every sample.
+
+Page numbers only ever go up through a lecture, so if two samples show the
+same page number every sample between them shows it too. We therefore read a
+coarse grid of samples first and only bisect the gaps whose ends disagree,
+until each change is pinned down to neighbouring samples. OCR work then grows
+with the number of slides times log(duration) rather than with duration.
+"""
+
+
+def find_page_runs(read_page_at, sample_count, coarse_step):
+    """
+    Finds where the page number changes among samples 0 .. sample_count - 1.
+
+    `read_page_at(index)` returns the page number shown at a sample index, or
+    None if it cannot be read; each index is read at most once. `coarse_step`
+    is the spacing of the first pass, in samples.
+
+    Returns (runs, probed): runs is a list of (page_number, first_index,
+    last_index) in time order, where first/last are the first and last readable
+    samples of each page (exact, given monotonic page numbers), and probed is
+    how many samples were read.
+    """
+    pages = {}
+
+    def page_at(index):
+        if index not in pages:
+            pages[index] = read_page_at(index)
+        return pages[index]
+
+    def refine(lo, hi):
+        # Both ends already read; nothing to locate between neighbours.
+        if hi - lo <= 1:
+            return
+        lo_page, hi_page = pages[lo], pages[hi]
+        if lo_page == hi_page:
+            # Same page on both ends: nothing changes in between. Two unreadable
+            # ends are treated the same way (a stretch without page numbers).
+            return
+        mid = (lo + hi) // 2
+        page_at(mid)
+        refine(lo, mid)
+        refine(mid, hi)
+
+    if sample_count <= 0:
+        return [], 0
+
+    coarse_indices = list(range(0, sample_count, max(1, coarse_step)))
+    if coarse_indices[-1] != sample_count - 1:
+        coarse_indices.append(sample_count - 1)
+    for index in coarse_indices:
+        page_at(index)
+    for lo, hi in zip(coarse_indices, coarse_indices[1:]):
+        refine(lo, hi)
+
+    runs = []
+    for index in sorted(pages):
+        page_number = pages[index]
+        if page_number is None:
+            continue
+        if runs and runs[-1][0] == page_number:
+            runs[-1][2] = index
+        else:
+            runs.append([page_number, index, index])
+    return [tuple(run) for run in runs], len(pages)
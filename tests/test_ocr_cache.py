@@ -0,0 +1,39 @@
+"""
+The OCR cache must keep each backend's reading of a crop apart, and count the
+hits and misses of worker processes once each.
+"""
+import numpy as np
+
+from slide_pipeline import ocr_cache
+
+
+class FakeBackend:
+    def __init__(self, name, text):
+        self.name = name
+        self.text = text
+        self.calls = 0
+
+    def image_to_string(self, image, config=''):
+        self.calls += 1
+        return self.text
+
+
+def test_backends_do_not_share_entries(tmp_path):
+    cache = ocr_cache.OcrCache(str(tmp_path / "cache.sqlite3"), 100)
+    crop = np.full((20, 40), 200, dtype=np.uint8)
+    tiled, single = FakeBackend("tiled", "7"), FakeBackend("pytesseract", "1")
+    assert cache.wrap(tiled).image_to_string(crop, '--psm 6') == "7"
+    assert cache.wrap(single).image_to_string(crop, '--psm 6') == "1"
+    assert cache.wrap(tiled).image_to_string(crop, '--psm 6') == "7"
+    assert (tiled.calls, single.calls) == (1, 1)
+    assert cache.take_counts() == (1, 2)
+    assert cache.take_counts() == (0, 0)
+
+
+def test_worker_counts_are_added_once_per_call(tmp_path):
+    cache = ocr_cache.OcrCache(str(tmp_path / "cache.sqlite3"), 100)
+    first, second = (3, (1, 0)), (4, (0, 1))
+    # ordered_map hands a skipped item the previous call's result again
+    results = [("a", first), ("b", first), ("c", None), ("d", second), ("e", second)]
+    assert list(ocr_cache.add_worker_counts(results, cache)) == [("a", 3), ("b", 3), ("c", None), ("d", 4), ("e", 4)]
+    assert (cache.hits, cache.misses) == (1, 1)
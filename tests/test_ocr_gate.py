@@ -0,0 +1,46 @@
+"""
+The OCR gate must never change which pages are detected: a region it skips
+has to show the same page number as the last one that went through OCR.
+"""
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw, ImageFont
+
+from slide_pipeline import ocr_gate
+
+# The default PAGE_NUMBER_REGION_WIDTH x PAGE_NUMBER_REGION_HEIGHT
+REGION_SIZE = (150, 80)
+FRAMES_PER_PAGE = 3
+
+
+def render_page_number(page_number, font_size, rng):
+    """A page-number region as a grayscale array, with compression-like noise below the gate's pixel delta."""
+    image = Image.new('L', REGION_SIZE, 235)
+    ImageDraw.Draw(image).text((100, 50), str(page_number), fill=30, font=ImageFont.load_default(size=font_size))
+    noisy = np.asarray(image, dtype=np.int16) + rng.integers(-8, 9, size=(REGION_SIZE[1], REGION_SIZE[0]))
+    return np.clip(noisy, 0, 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("font_size", [14, 18])
+def test_gate_keeps_every_page_change_of_small_digits(font_size):
+    rng = np.random.default_rng(font_size)
+    frames = [(page_number, render_page_number(page_number, font_size, rng))
+              for page_number in range(1, 61) for _ in range(FRAMES_PER_PAGE)]
+    truth = {f"frame_{i}": page_number for i, (page_number, _) in enumerate(frames)}
+
+    gate = ocr_gate.OcrGate(threshold=0, pixel_delta=32)
+    read = gate.wrap(lambda roi, frame_label: truth[frame_label])
+    pages_read = [read(roi, f"frame_{i}") for i, (_, roi) in enumerate(frames)]
+
+    assert pages_read == [page_number for page_number, _ in frames]
+    # The noise alone never reaches OCR, so only the page changes cost a call
+    assert gate.ocr_calls == 60
+    assert gate.ocr_calls_saved == 60 * (FRAMES_PER_PAGE - 1)
+
+
+def test_changed_pixels_counts_pixels_beyond_the_delta():
+    previous = np.zeros((4, 4), dtype=np.int16)
+    gray = previous.copy()
+    gray[0, 0], gray[1, 1] = 33, 32
+    assert ocr_gate.changed_pixels(gray, previous, 32) == 1
+    assert ocr_gate.changed_pixels(np.zeros((2, 2), dtype=np.int16), previous, 32) == 16
@@ -0,0 +1,67 @@
+"""
+The batched NumPy preprocessing must give exactly the pixels of the PIL chain
+it replaces: convert('L'), ImageEnhance.Contrast, point() to a '1' threshold
+and a LANCZOS resize.
+"""
+import numpy as np
+import pytest
+from PIL import Image, ImageEnhance
+
+from slide_pipeline import preprocess
+
+
+def random_crops(rng, count, size, mode):
+    width, height = size
+    shape = (height, width, 3) if mode == 'RGB' else (height, width)
+    return [Image.fromarray(rng.integers(0, 256, size=shape, dtype=np.uint8), mode) for _ in range(count)]
+
+
+def pil_chain(crop, contrast, level, scale):
+    image = crop.convert('L')
+    if contrast is not None:
+        image = ImageEnhance.Contrast(image).enhance(contrast)
+    if level is not None:
+        image = image.point(lambda x: 0 if x < level else 255, '1')
+    if scale != 1:
+        image = image.resize((int(image.width * scale), int(image.height * scale)), Image.LANCZOS)
+    return np.asarray(image.convert('L'))
+
+
+@pytest.mark.parametrize("mode", ['L', 'RGB'])
+@pytest.mark.parametrize("contrast, level, scale", [
+    (None, None, 1),
+    (2.0, None, 1),
+    (1.5, None, 2),
+    (None, None, 3),
+    (None, 128, 1),
+    (2.0, 140, 2),
+    (0.7, 90, 1.5),
+])
+def test_matches_the_pil_chain(mode, contrast, level, scale):
+    rng = np.random.default_rng(7)
+    preprocessor = preprocess.Preprocessor(contrast, level, scale)
+    for size in [(150, 80), (37, 19)]:
+        crops = random_crops(rng, 5, size, mode)
+        batch = preprocessor(crops)
+        for crop, processed in zip(crops, batch):
+            np.testing.assert_array_equal(processed, pil_chain(crop, contrast, level, scale))
+
+
+def test_accepts_numpy_crops_like_pil_ones():
+    rng = np.random.default_rng(1)
+    crops = random_crops(rng, 4, (60, 30), 'RGB')
+    preprocessor = preprocess.Preprocessor(1.8, 120, 2)
+    np.testing.assert_array_equal(preprocessor([np.asarray(crop) for crop in crops]), preprocessor(crops))
+
+
+def test_otsu_level_splits_with_the_largest_between_class_variance():
+    rng = np.random.default_rng(2)
+    gray = rng.integers(0, 256, size=(3, 20, 30), dtype=np.uint8)
+    gray[0, :10] //= 4 # A dark half and a light half
+    for crop, level in zip(gray, preprocess.otsu_levels(gray)):
+        def between(split):
+            dark, light = crop[crop < split].astype(float), crop[crop >= split].astype(float)
+            if not dark.size or not light.size:
+                return -1.0
+            return dark.size * light.size * (dark.mean() - light.mean()) ** 2
+        assert between(level) == pytest.approx(max(between(split) for split in range(1, 256)))
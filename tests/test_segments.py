@@ -0,0 +1,86 @@
+"""
+Reading a video in time segments must give the same page runs, and so the
+same slides, as one serial pass, whatever the segment boundaries cut through.
+"""
+import random
+
+import pytest
+
+from slide_pipeline import frame_stream, segments, slide_selector
+
+
+def pairs(page_numbers, start=0, stop=None):
+    stop = len(page_numbers) if stop is None else stop
+    return [(frame_stream.Frame(i, float(i), None, None), page_numbers[i]) for i in range(start, stop)]
+
+
+def segmented_runs(page_numbers, ranges):
+    """What read_page_segments merges: the page runs of every range, read on their own."""
+    return segments.merge_runs(segments.page_runs(pairs(page_numbers, start, stop))[0] for start, stop in ranges)
+
+
+def selected(policy, pairs_in_order):
+    selector = slide_selector.create_selector(policy)
+    for frame, page_number in pairs_in_order:
+        selector.add(frame, page_number)
+    return [slide.frame.index for slide in selector.slides]
+
+
+def random_sequence(rng):
+    page_numbers, page = [], 1
+    for _ in range(rng.randint(1, 60)):
+        roll = rng.random()
+        if roll < 0.15:
+            page_numbers.append(None)
+        elif roll < 0.25:
+            page_numbers.append(rng.randint(0, 20)) # Misread, so the runs are not monotonic
+        else:
+            page += rng.random() < 0.2
+            page_numbers.append(page)
+    return page_numbers
+
+
+def random_ranges(rng, sample_count):
+    cuts = sorted(rng.sample(range(1, sample_count), rng.randint(0, min(6, sample_count - 1))))
+    bounds = [0] + cuts + [None]
+    return list(zip(bounds, bounds[1:]))
+
+
+def test_merge_joins_a_page_split_across_boundaries():
+    page_numbers = [1, 1, 1, 2, 2, 2, 2, 2, 3, 3]
+    # Page 2 spans all three segments, with an unreadable sample on a boundary
+    page_numbers[5] = None
+    ranges = [(0, 4), (4, 6), (6, None)]
+    assert segmented_runs(page_numbers, ranges) == [(1, 0, 2), (2, 3, 7), (3, 8, 9)]
+
+
+def test_merge_keeps_non_monotonic_runs_apart():
+    page_numbers = [1, 1, 2, 2, 1, 1, 2, 2]
+    assert segmented_runs(page_numbers, [(0, 2), (2, 4), (4, 6), (6, None)]) == [
+        (1, 0, 1), (2, 2, 3), (1, 4, 5), (2, 6, 7)]
+
+
+def test_merge_matches_one_serial_pass():
+    rng = random.Random(17)
+    for _ in range(500):
+        page_numbers = random_sequence(rng)
+        ranges = random_ranges(rng, len(page_numbers))
+        assert segmented_runs(page_numbers, ranges) == segments.page_runs(pairs(page_numbers))[0], \
+            (page_numbers, ranges)
+
+
+@pytest.mark.parametrize("policy", ["first", "last"])
+def test_one_sample_per_merged_run_selects_the_serial_slides(policy):
+    rng = random.Random(3)
+    for _ in range(500):
+        page_numbers = random_sequence(rng)
+        runs = segmented_runs(page_numbers, random_ranges(rng, len(page_numbers)))
+        one_per_run = [(frame_stream.Frame(first if policy == "first" else last, 0.0, None, None), page_number)
+                       for page_number, first, last in runs]
+        assert selected(policy, one_per_run) == selected(policy, pairs(page_numbers)), page_numbers
+
+
+def test_split_samples_covers_every_sample_once():
+    assert segments.split_samples(0, 100, 4) == [(0, 25), (25, 50), (50, 75), (75, None)]
+    assert segments.split_samples(10, 100, 4, min_samples=40) == [(10, 55), (55, None)]
+    assert segments.split_samples(0, 5, 4, min_samples=10) == [(0, None)]
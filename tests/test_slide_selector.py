@@ -0,0 +1,128 @@
+"""
+The streaming selectors must pick exactly the slides of the original scripts:
+3.py's forward scan (first frame of each page) and 4.py's reverse scan (last
+frame of each page), also when a run is resumed from a manifest checkpoint.
+"""
+import json
+import random
+
+import pytest
+
+from slide_pipeline import frame_stream, slide_selector
+
+PAGE_SEQUENCES = [
+    [],
+    [None, None],
+    [1, 1, 2, 2, 3],
+    [None, 1, 1, 2, None, 2, 3, 3],
+    [2, 2, None, 1, 3, 3, 4], # A page before the first one read
+    [1, 2, 7, 2, 3, 3, 4, 4, 5], # An OCR error reads 7 for page 2
+    [1, 2, 3, 1, 2, 3, 4], # The video loops back
+    [5, 4, 3, 2, 1],
+    [3, 3, 3],
+    [0, 0, 1, None, None, 1, 10, 2, 2],
+]
+
+
+def baseline_first(page_numbers):
+    """The indexes of the frames the original 3.py copied, scanning forwards."""
+    kept = []
+    previous_page_number = -1
+    current_image = None
+    for i, page_number in enumerate(page_numbers):
+        if page_number is None:
+            continue
+        if page_number > previous_page_number:
+            if i == 0 or current_image is not None:
+                kept.append(i)
+            previous_page_number = page_number
+            current_image = i
+        elif page_number == previous_page_number:
+            current_image = i
+    return kept
+
+
+def baseline_last(page_numbers):
+    """The indexes of the frames the original 4.py kept, scanning backwards."""
+    kept = []
+    last_processed_page_number = float('inf')
+    for i in reversed(range(len(page_numbers))):
+        if page_numbers[i] is not None and page_numbers[i] < last_processed_page_number:
+            kept.append(i)
+            last_processed_page_number = page_numbers[i]
+    return sorted(kept)
+
+
+BASELINES = {"first": baseline_first, "last": baseline_last}
+
+
+def frames(page_numbers, start=0):
+    return [(frame_stream.Frame(i, float(i), None, None), page_numbers[i]) for i in range(start, len(page_numbers))]
+
+
+def feed(selector, pairs, files):
+    """Runs `pairs` through `selector` the way the scripts do; `files` is the set of slides on disk."""
+    for frame, page_number in pairs:
+        emitted, withdrawn = selector.add(frame, page_number)
+        for slide in withdrawn:
+            files.discard(slide.file)
+        for slide in emitted:
+            slide.file = f"slide_{slide.frame.index}"
+            files.add(slide.file)
+
+
+def finish(selector, files):
+    for slide in selector.flush():
+        slide.file = f"slide_{slide.frame.index}"
+        files.add(slide.file)
+    return [slide.frame.index for slide in selector.slides]
+
+
+def random_sequences(count=200):
+    rng = random.Random(1)
+    for _ in range(count):
+        page_numbers, page = [], 1
+        for _ in range(rng.randint(0, 30)):
+            roll = rng.random()
+            if roll < 0.15:
+                page_numbers.append(None)
+            elif roll < 0.25:
+                page_numbers.append(rng.randint(0, 20)) # Misread
+            else:
+                page += rng.random() < 0.3
+                page_numbers.append(page)
+        yield page_numbers
+
+
+@pytest.mark.parametrize("policy", ["first", "last"])
+def test_selector_matches_the_original_scan(policy):
+    for page_numbers in PAGE_SEQUENCES + list(random_sequences()):
+        selector = slide_selector.create_selector(policy)
+        files = set()
+        feed(selector, frames(page_numbers), files)
+        kept = finish(selector, files)
+        assert kept == BASELINES[policy](page_numbers), page_numbers
+        # Withdrawn slides are deleted again, so exactly the kept ones stay on disk
+        assert files == {f"slide_{i}" for i in kept}
+
+
+@pytest.mark.parametrize("policy", ["first", "last"])
+def test_selector_resumes_from_a_manifest_checkpoint(policy):
+    for page_numbers in PAGE_SEQUENCES + list(random_sequences(50)):
+        for checkpoint in range(len(page_numbers) + 1):
+            selector = slide_selector.create_selector(policy)
+            files = set()
+            pairs = frames(page_numbers)
+            feed(selector, pairs[:checkpoint], files)
+            finish(selector, files) # save_checkpoint writes every candidate first
+            saved = json.loads(json.dumps({"pages": [slide.as_dict() for slide in selector.slides],
+                                           "state": selector.state()}))
+
+            resumed = slide_selector.create_selector(policy, saved["pages"], saved["state"])
+            feed(resumed, pairs[checkpoint:], files)
+            assert finish(resumed, files) == BASELINES[policy](page_numbers), (page_numbers, checkpoint)
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        slide_selector.create_selector("middle")
@@ -0,0 +1,61 @@
+"""
+The transition search must find the same page runs, and so the same slides,
+as reading every sample does, while reading far fewer of them.
+"""
+import random
+
+import pytest
+
+from slide_pipeline import transition_search
+
+
+def serial_runs(page_numbers):
+    """The runs a serial pass over every sample finds: (page_number, first_index, last_index)."""
+    runs = []
+    for index, page_number in enumerate(page_numbers):
+        if page_number is None:
+            continue
+        if runs and runs[-1][0] == page_number:
+            runs[-1][2] = index
+        else:
+            runs.append([page_number, index, index])
+    return [tuple(run) for run in runs]
+
+
+def lecture(rng, sample_count, page_count):
+    """A page number per sample: `page_count` pages of random lengths, going up."""
+    changes = sorted(rng.sample(range(1, sample_count), page_count - 1))
+    return [1 + sum(index >= change for change in changes) for index in range(sample_count)]
+
+
+def search(page_numbers, coarse_step):
+    reads = []
+
+    def read_page_at(index):
+        reads.append(index)
+        return page_numbers[index]
+
+    runs, probed = transition_search.find_page_runs(read_page_at, len(page_numbers), coarse_step)
+    assert len(reads) == len(set(reads)) == probed # Every sample is read at most once
+    return runs, probed
+
+
+@pytest.mark.parametrize("coarse_step", [1, 7, 30, 1000])
+def test_finds_the_same_runs_as_a_serial_pass(coarse_step):
+    rng = random.Random(coarse_step)
+    for _ in range(100):
+        sample_count = rng.randint(2, 600)
+        page_numbers = lecture(rng, sample_count, rng.randint(1, min(40, sample_count)))
+        assert search(page_numbers, coarse_step)[0] == serial_runs(page_numbers)
+
+
+def test_reads_a_fraction_of_a_long_video():
+    # Two hours at one sample a second, 60 slides
+    page_numbers = lecture(random.Random(0), 7200, 60)
+    runs, probed = search(page_numbers, 30)
+    assert len(runs) == 60
+    assert probed < 7200 / 4
+
+
+def test_empty_video():
+    assert transition_search.find_page_runs(lambda index: 1, 0, 30) == ([], 0)